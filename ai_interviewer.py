@@ -1,42 +1,54 @@
 # ai_interviewer.py
-from langchain_openai import ChatOpenAI
+import re
+import json
 from langchain.schema import HumanMessage
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-llm = ChatOpenAIllm = ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"), temperature=0.7)
+import llm_client
+import prescorer
+import prompt_templates
+import fallbacks
 
 def follow_up_questions(user_answer: str, original_question_text: str): # Updated signature
+    prescore = prescorer.prescore(user_answer, original_question_text, "follow_up_questions")
+    if prescore["skip"]:
+        return {"follow_up": prescorer.templated_follow_ups(prescore["reason"]), "degraded": False}
+
     prompt = f"""The candidate was asked: '{original_question_text}'
               The candidate responded with: '{user_answer}'.
+              {prescorer.describe_features(prescore["features"])}
               Generate two concise, clarifying or follow-up interview questions based on their response to the original question.
               Each follow-up question should be on a new line. Do not include any preamble, just the questions."""
-    response = llm.invoke([HumanMessage(content=prompt)]) # Use invoke for newer Langchain
+    try:
+        response = llm_client.invoke("follow_up_questions", [HumanMessage(content=prompt)]) # Use invoke for newer Langchain
+    except llm_client.LLMUnavailable:
+        return {"follow_up": fallbacks.follow_ups(), "degraded": True}
     # Ensure proper splitting and filtering of empty lines
-    return [line.strip() for line in response.content.split("\n") if line.strip()]
-
+    return {"follow_up": [line.strip() for line in response.content.split("\n") if line.strip()], "degraded": False}
 
-def feedback_on_code(code: str, question: str):
-    prompt = f"""You are an interview coach. Evaluate the following Python code written in response to a coding interview question.
 
-    Question: {question}
-    Code:
-    ```python
-    {code}
-    ```
+def describe_profile(report):
+    """Compact text form of a code_evaluator profiling report for the feedback prompt."""
+    if not report:
+        return "not requested."
+    lines = [f"status {report.get('status')}, {report.get('wall_time', 0):.3f}s under the profiler, "
+             f"peak memory {report.get('peak_memory_bytes', 0) / 1024:.1f} KB."]
+    for row in report.get("top_functions", []):
+        lines.append(f"- {row['function']}: {row['calls']} calls, {row['cumulative_time']:.4f}s cumulative, "
+                     f"{row['own_time']:.4f}s own")
+    for row in report.get("hot_lines", []):
+        lines.append(f"- line {row['line']} ({row['share']:.0%} of samples): {row['code']}")
+    return "\n".join(lines)
 
-    First, provide constructive feedback on logic, efficiency, readability, and any improvements.
-    Then, on new lines, provide exactly two follow-up or clarifying questions to ask the candidate, each prefixed with "Follow-up:".
-    Ensure your response is structured so that feedback comes first, then the follow-up questions.
 
-    Example of your output format:
-    [Your constructive feedback here...]
-
-    Follow-up: Could you explain the time complexity of your solution?
-    Follow-up: How would you handle an empty input array?
-    """
-    response = llm.invoke([HumanMessage(content=prompt)]) # Use invoke
+def feedback_on_code(code: str, question: str, profile_report=None, language: str = "python"):
+    if language == "sql":
+        messages = prompt_templates.render("feedback_on_sql", question=question, code=code)
+    else:
+        messages = prompt_templates.render("feedback_on_code", question=question, code=code,
+                                           profile=describe_profile(profile_report))
+    try:
+        response = llm_client.invoke("feedback_on_code", messages)
+    except llm_client.LLMUnavailable:
+        return dict(fallbacks.code_feedback(profile_report, language), degraded=True)
     response_content = response.content
     
     lines = response_content.splitlines()
@@ -57,4 +69,80 @@ def feedback_on_code(code: str, question: str):
         # For now, let's assume the LLM follows the "Follow-up:" prefix instruction.
         pass
 
-    return {"feedback_text": feedback_text, "follow_up_questions": follow_ups}
+    return {"feedback_text": feedback_text, "follow_up_questions": follow_ups, "degraded": False}
+
+
+def _format_follow_ups(items):
+    blocks = []
+    for index, item in items:
+        answer = f"```python\n{item['answer']}\n```" if item.get("type") == "code" else f'"{item["answer"]}"'
+        blocks.append(f"[{index}] Follow-up ({item.get('type', 'text')}): {item['question']}\nAnswer: {answer}")
+    return "\n\n".join(blocks)
+
+
+def _parse_grades(content):
+    """index -> {"score", "feedback"} from the model's JSON reply; empty if it isn't valid JSON."""
+    match = re.search(r"\{.*\}", content, re.DOTALL)  # tolerate code fences or stray text around the object
+    try:
+        grades = json.loads(match.group(0))["grades"] if match else []
+    except (ValueError, KeyError, TypeError):
+        return {}
+    parsed = {}
+    for grade in grades if isinstance(grades, list) else []:
+        try:
+            index = int(grade["index"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        parsed[index] = {"score": _parse_score(grade.get("score")), "feedback": str(grade.get("feedback", "")).strip()}
+    return parsed
+
+
+def _parse_score(value):
+    """1-10 integer from a score like 7, 7.5, "7" or "7/10"; None if there's no number."""
+    match = re.match(r"\s*(\d+(?:\.\d+)?)", str(value)) if value is not None and not isinstance(value, bool) else None
+    return min(10, max(1, int(float(match.group(1))))) if match else None
+
+
+def _fallback_grade(item):
+    if item.get("type") == "code":
+        return fallbacks.code_feedback()["feedback_text"]
+    return fallbacks.text_feedback(prescorer.compute_features(item["answer"], item["question"]))
+
+
+def grade_follow_ups(original_question: str, answers: list, original_answer: str = ""):
+    """Grade all follow-up answers in one LLM call.
+
+    answers is a list of {"question", "answer", "type": "text"|"code"}. Trivial
+    text answers get templated feedback without going to the LLM; the rest share
+    one prompt carrying the original question context once. Returns
+    {"grades": [{"question", "score", "feedback"}], "degraded"} in input order.
+    """
+    grades = [None] * len(answers)
+    to_grade = []
+    for i, item in enumerate(answers):
+        if item.get("type") != "code":
+            prescore = prescorer.prescore(item["answer"], item["question"], "grade_follow_ups")
+            if prescore["skip"]:
+                grades[i] = {"score": 1, "feedback": prescorer.TEMPLATED_FEEDBACK[prescore["reason"]]}
+                continue
+        to_grade.append((len(to_grade) + 1, item))
+
+    degraded = False
+    if to_grade:
+        messages = prompt_templates.render("grade_follow_ups", question=original_question,
+                                           original_answer=original_answer or "(not recorded)",
+                                           follow_ups=_format_follow_ups(to_grade))
+        try:
+            response = llm_client.invoke("grade_follow_ups", messages)
+            parsed = _parse_grades(response.content)
+        except llm_client.LLMUnavailable:
+            parsed = {index: {"score": None, "feedback": _fallback_grade(item)} for index, item in to_grade}
+            degraded = True
+        pending = iter(to_grade)
+        for i in range(len(answers)):
+            if grades[i] is None:
+                index, _ = next(pending)
+                grades[i] = parsed.get(index, {"score": None, "feedback": "No feedback was returned for this answer."})
+
+    return {"grades": [dict(grade, question=item["question"]) for grade, item in zip(grades, answers)],
+            "degraded": degraded}
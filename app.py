@@ -4,12 +4,19 @@ from pydantic import BaseModel
 from question_generator import generate_question, generate_jd_based_questions # Add new import
 from typing import List # For response model
 from code_evaluator import evaluate_code
-from ai_interviewer import follow_up_questions, feedback_on_code
+from ai_interviewer import follow_up_questions, feedback_on_code, grade_follow_ups
 from system_design_assessor import assess_design
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from text_evaluator import evaluate_text_answer
+import llm_client
+import model_router
+import prescorer
+import prompt_templates
+import fallbacks
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
+import json
 
 
 app = FastAPI()
@@ -35,11 +42,16 @@ class QuestionRequest(BaseModel):
 class CodeFeedbackRequest(BaseModel): # Ensure this is defined
     user_code: str
     question: str
+    language: str = "python" # "sql" reviews the submission as a query
+    profile_report: Optional[Dict[str, Any]] = None # "profile" from /evaluate-code, grounds efficiency feedback
 
 class CodeEvaluationRequest(BaseModel):
     language: str
     user_code: str
     question_id: int
+    session_id: Optional[str] = None # Lets resubmissions run previously failed cases first
+    quick_check: bool = False # Stop at the first failing case
+    profile: bool = False # Profile the largest test case and report hot spots
 
 class TextEvaluationRequest(BaseModel):
     user_answer: str
@@ -49,12 +61,37 @@ class FollowUpRequest(BaseModel): # For the /ai-follow-up endpoint
     user_answer: str
     question_text: str # Changed from question_id
     
+class FollowUpAnswer(BaseModel):
+    question: str
+    answer: str
+    type: str = "text" # "text" or "code"
+
+class FollowUpBatchRequest(BaseModel): # For /evaluate-followups
+    original_question: str
+    original_answer: Optional[str] = ""
+    answers: List[FollowUpAnswer]
+    
 class JDQuestionRequest(BaseModel):
     job_description: str
     num_questions: Optional[int] = 3
     
 class JDQuestionsResponse(BaseModel):
     questions: List[str]
+    from_bank: int = 0 # Served from the local question bank
+    generated: int = 0 # Generated by the LLM for skills the bank doesn't cover
+    degraded: bool = False # LLM unavailable; all questions came from the bank
+
+@app.get("/metrics/llm")
+def llm_metrics():
+    """Counters for the shared LLM call path: request coalescing, per-task routing latency/cost and pre-scorer skips."""
+    return {
+        "single_flight": llm_client.get_stats(),
+        "routing": model_router.metrics.snapshot(),
+        "prescorer": prescorer.get_stats(),
+        "prompt_templates": prompt_templates.loaded_versions(),
+        "circuit_breaker": llm_client.breaker.snapshot(),
+        "degraded_responses": fallbacks.get_stats(),
+    }
 
 @app.post("/generate-question")
 def generate(request: QuestionRequest):  
@@ -63,10 +100,10 @@ def generate(request: QuestionRequest):
         difficulty = request.difficulty
         print(f"🔹 Received Request -> Mode: {request.mode}, Difficulty: {request.difficulty}")
 
-        question = generate_question(request.mode, request.difficulty)
-        print(f"✅ Generated Question: {question}")
+        result = generate_question(request.mode, request.difficulty)
+        print(f"✅ Generated Question: {result['question']}")
 
-        return {"question": question}
+        return result
     
     except Exception as e:
         print(f"🔥 ERROR processing request: {e}")
@@ -78,7 +115,8 @@ def evaluate(request: CodeEvaluationRequest):
     Evaluate code submission using predefined test cases
     """
     try:
-        evaluation = evaluate_code(request.language, request.user_code, request.question_id)
+        evaluation = evaluate_code(request.language, request.user_code, request.question_id,
+                                   request.session_id, request.quick_check, request.profile)
         
         # Format response based on evaluation result
         if "error" in evaluation:
@@ -98,6 +136,12 @@ def evaluate(request: CodeEvaluationRequest):
                 "passed": passed,
                 "total": total,
                 "passed_percentage": (passed / total * 100) if total > 0 else 0,
+                "ran": evaluation.get("ran", total),
+                "quick_check": evaluation.get("quick_check", False),
+                "stopped_early": evaluation.get("stopped_early", False),
+                "run_id": evaluation.get("run_id"),
+                "performance": evaluation.get("performance"),
+                "profile": evaluation.get("profile"),
                 "results": evaluation.get("results", [])
             }
         
@@ -108,26 +152,49 @@ def evaluate(request: CodeEvaluationRequest):
         print(f"🔥 ERROR evaluating code: {str(e)}")
         return {"status": "error", "message": "Failed to evaluate code", "details": str(e)}
 
+@app.get("/evaluation-results/{run_id}/{test_case}/{field}")
+def get_full_test_value(run_id: str, test_case: int, field: str):
+    """
+    Fetch the full value of a test case field that was truncated in /evaluate-code.
+    """
+    from code_evaluator import get_full_value, NOT_FOUND
+
+    if field not in ("input", "expected", "actual"):
+        raise HTTPException(status_code=400, detail=f"Unknown field '{field}'")
+    value = get_full_value(run_id, test_case, field)
+    if value is NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    return {"run_id": run_id, "test_case": test_case, "field": field, "value": value}
+
 @app.post("/evaluate-text")
 def evaluate_text(request: TextEvaluationRequest):
-    feedback = evaluate_text_answer(request.user_answer, request.question)
-    return {"feedback": feedback}
+    return evaluate_text_answer(request.user_answer, request.question)
 
 @app.post("/ai-follow-up") # Updated endpoint for text-based follow-ups
 def follow_up(request: FollowUpRequest):
     # Pass the original question text to the follow_up_questions function
-    followups = follow_up_questions(request.user_answer, request.question_text)
-    return {"follow_up": followups}
+    return follow_up_questions(request.user_answer, request.question_text)
+
+@app.post("/evaluate-followups")
+def evaluate_followups(request: FollowUpBatchRequest):
+    """
+    Grade all follow-up answers for a question in a single LLM call.
+    """
+    if any(item.type not in ("text", "code") for item in request.answers):
+        raise HTTPException(status_code=400, detail="Answer type must be 'text' or 'code'")
+    answers = [{"question": item.question, "answer": item.answer, "type": item.type} for item in request.answers]
+    return grade_follow_ups(request.original_question, answers, request.original_answer or "")
 
 @app.post("/assess-design")
 def assess(user_response: dict):
     feedback = assess_design(user_response)
-    return {"feedback": feedback}
+    return {"feedback": feedback, "degraded": feedback["degraded"]}
 
 @app.post("/evaluate-code-ai")
 def evaluate_code_ai(request: CodeFeedbackRequest):
     # feedback_on_code now returns a dict
-    structured_response = feedback_on_code(request.user_code, request.question)
+    structured_response = feedback_on_code(request.user_code, request.question, request.profile_report,
+                                           request.language)
     return structured_response # FastAPI will automatically convert this dict to JSON
 
 @app.get("/get-test-cases/{question_id}")
@@ -138,7 +205,21 @@ def get_test_cases_for_question(question_id: int):
     """
     try:
         from code_evaluator import get_test_cases
-        
+        from sql_evaluator import get_sql_question
+
+        sql_question = get_sql_question(question_id)
+        if sql_question:
+            # SQL questions are checked against fixture databases rather than function inputs
+            return {
+                "status": "success",
+                "language": "sql",
+                "question": sql_question["question"],
+                "function_name": None,
+                "schema": sql_question["schema"].strip(),
+                "test_cases": [{"test_number": i + 1, "input": case["name"]}
+                               for i, case in enumerate(sql_question["cases"])]
+            }
+
         test_cases = get_test_cases(question_id)
         if not test_cases or "cases" not in test_cases:
             return {"status": "error", "message": f"No test cases found for question ID {question_id}"}
@@ -155,6 +236,7 @@ def get_test_cases_for_question(question_id: int):
             
         return {
             "status": "success",
+            "question": test_cases.get("question"),
             "function_name": test_cases["function_name"],
             "test_cases": formatted_cases
         }
@@ -169,32 +251,46 @@ def execute_code(language: str = Body(...), user_code: str = Body(...)):
     Simple code execution without test cases - just runs the code
     """
     try:
-        import subprocess
-        import tempfile
-        import sys
-        
+        from sandbox_exec import run_source
+
         if language.lower() != "python":
             return {"error": "Currently, only Python execution is supported."}
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".py") as temp_file:
-            temp_file.write(user_code.encode())
-            temp_file.flush()
-            
-            try:
-                result = subprocess.run([sys.executable, temp_file.name],
-                                      capture_output=True, text=True, timeout=10)
-                return {
-                    "stdout": result.stdout,
-                    "stderr": result.stderr,
-                    "return_code": result.returncode
-                }
-            except subprocess.TimeoutExpired:
-                return {"error": "Code execution timed out."}
+
+        # Source goes to the interpreter over stdin; output is read incrementally up to a byte cap
+        result = run_source(user_code, timeout=10)
+        if result.timed_out:
+            return {"error": "Code execution timed out.", "stdout": result.stdout, "stderr": result.stderr}
+        response = {
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "return_code": result.returncode
+        }
+        if result.output_limit_exceeded:
+            response["error"] = "Output limit exceeded."
+        return response
     except Exception as e:
         return {"error": f"Execution failed: {str(e)}"}
-    
+
+@app.post("/execute-code/stream")
+def execute_code_stream(language: str = Body(...), user_code: str = Body(...)):
+    """
+    Run code and stream its output live as Server-Sent Events.
+    Events: "stdout"/"stderr" with text chunks, then "exit" with the return code.
+    """
+    from sandbox_exec import stream_source
+
+    def events():
+        if language.lower() != "python":
+            yield f"event: error\ndata: {json.dumps('Currently, only Python execution is supported.')}\n\n"
+            return
+        # If the client disconnects, closing this generator kills the process
+        for kind, data in stream_source(user_code, timeout=10):
+            yield f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.post("/generate-jd-questions", response_model=JDQuestionsResponse)
-async def generate_jd_questions_endpoint(request: JDQuestionRequest):
+def generate_jd_questions_endpoint(request: JDQuestionRequest):
     try:
         print(f"🔹 Received JD Question Request for {request.num_questions} questions.")
         result = generate_jd_based_questions(request.job_description, request.num_questions)
@@ -1,115 +1,381 @@
-import subprocess
-import tempfile
 import sys
-import importlib.util
 import json
+import os
+import uuid
+import pickle
+import random
+import threading
+from collections import OrderedDict
 
-def evaluate_code(language: str, user_code: str, question_id: int):
+from sandbox_protocol import encode_frame, read_frames, summarize_value, digest, ProtocolError
+from sandbox_exec import run_source, run_harness
+from stress_artifacts import ArrayArtifact
+
+def evaluate_code(language: str, user_code: str, question_id: int, session_id=None, quick_check=False,
+                  profile=False):
+    if language.lower() == "sql":
+        from sql_evaluator import evaluate_sql
+        return evaluate_sql(user_code, question_id)
     if language.lower() != "python":
-        return {"error": "Currently, only Python evaluation is supported."}
+        return {"error": "Currently, only Python and SQL evaluation are supported."}
 
     # Define test cases based on question_id
     test_cases = get_test_cases(question_id)
     
     # First run - just execute the code to catch syntax errors
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".py") as temp_file:
-        temp_file_path = temp_file.name
-        temp_file.write(user_code.encode())
-        temp_file.flush()
-        
-        try:
-            # Basic execution check
-            result = subprocess.run([sys.executable, temp_file_path],
-                                  capture_output=True, text=True, timeout=10)
-            
-            if result.returncode != 0:
-                return {
-                    "success": False,
-                    "stdout": result.stdout,
-                    "stderr": result.stderr,
-                    "error": "Code execution failed with errors."
-                }
-            
-            # If basic execution succeeded, run test cases
-            test_results = run_test_cases(temp_file_path, test_cases, question_id)
-            return test_results
-            
-        except subprocess.TimeoutExpired:
+    try:
+        # Basic execution check; the source is piped to the interpreter, never written to disk
+        result = run_source(user_code, timeout=10)
+
+        if result.timed_out:
             return {"success": False, "error": "Code execution timed out."}
-        except Exception as e:
-            return {"success": False, "error": f"Unexpected error: {str(e)}"}
+        if result.output_limit_exceeded:
+            return {"success": False, "stdout": result.stdout, "stderr": result.stderr,
+                    "error": "Output limit exceeded."}
+        if result.returncode != 0:
+            return {
+                "success": False,
+                "stdout": result.stdout,
+                "stderr": result.stderr,
+                "error": "Code execution failed with errors."
+            }
+
+        # If basic execution succeeded, run test cases
+        test_results = run_test_cases(user_code, test_cases, question_id, session_id, quick_check, profile)
+        return test_results
+
+    except Exception as e:
+        return {"success": False, "error": f"Unexpected error: {str(e)}"}
+
+# Stress cases are judged against a limit derived from the reference solution's runtime
+TIME_LIMIT_MULTIPLIER = 3.0
+MIN_TIME_LIMIT = 0.5  # seconds; floor so tiny reference timings don't make limits flaky
+DEFAULT_TIME_LIMIT = 2.0  # per case when a question has no reference baseline
+REFERENCE_REPEATS = 3  # reference time is the best of this many runs
+PROFILE_TIMEOUT_FACTOR = 3  # matches the harness's allowance for the profiled re-run
+HARNESS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_runner.py")
+
+
+def _random_array(seed, size, low=-1000, high=1000):
+    rng = random.Random(seed)
+    return [rng.randint(low, high) for _ in range(size)]
+
+
+TEST_CASE_REGISTRY = {
+    1: {  # Max subarray sum
+        # Shown in place of the generated question, since submissions are graded against these cases
+        "question": "Write a function max_subarray_sum(nums) that returns the largest sum of any contiguous, "
+                    "non-empty subarray of the list of integers nums. Aim for O(n) time.",
+        "function_name": "max_subarray_sum",
+        "cases": [
+            {"input": [[1, 2, 3, 4, 5]], "expected": 15},
+            {"input": [[-2, 1, -3, 4, -1, 2, 1, -5, 4]], "expected": 6},
+            {"input": [[-1, -2, -3, -4]], "expected": -1},
+            {"input": [[5]], "expected": 5}
+        ],
+        # Expected outputs and time limits for stress cases come from the reference run.
+        # Large arrays live in test_data/ and are memory-mapped by the harness.
+        "stress_cases": [
+            {"input": [_random_array(seed=1, size=20_000)]},
+            {"input": [ArrayArtifact("max_subarray_sum_100k.npy", seed=2, size=100_000)]},
+            {"input": [ArrayArtifact("max_subarray_sum_1m.npy", seed=3, size=1_000_000)]},
+        ],
+        "reference_solution": """
+def max_subarray_sum(nums):
+    max_current = max_global = nums[0]
+    for num in nums[1:]:
+        max_current = max(num, max_current + num)
+        max_global = max(max_global, max_current)
+    return max_global
+""",
+    },
+    # Add more question IDs and their test cases here
+}
+
+# question_id -> {"times": [...], "expected": [...]}, measured once per process
+_reference_baselines = {}
+
+# id(input) -> (input, digest, encoded input frame, artifact refs, artifact bytes).
+# Registry inputs are long-lived, so each one is serialized once per process;
+# holding the object keeps its id unique.
+_encoded_inputs = {}
+
+# run_id -> full (untruncated) results, pickled, so large values can be fetched on
+# demand. Bounded by total bytes: one run can hold megabytes of input and output.
+MAX_STORED_BYTES = 64 * 1024 * 1024
+_stored_results = OrderedDict()
+_stored_bytes = 0
+_stored_lock = threading.Lock()
+NOT_FOUND = object()  # returned by get_full_value for unknown runs, cases or fields
+
+# (session_id, question_id) -> indexes of cases that failed on the last submission,
+# so a resubmission can run them first
+MAX_TRACKED_SUBMISSIONS = 1024
+_failed_cases = OrderedDict()
+
 
 def get_test_cases(question_id):
     """Return test cases based on question ID."""
-    test_case_map = {
-        1: {  # Max subarray sum
-            "function_name": "max_subarray_sum",
-            "cases": [
-                {"input": [[1, 2, 3, 4, 5]], "expected": 15},
-                {"input": [[-2, 1, -3, 4, -1, 2, 1, -5, 4]], "expected": 6},
-                {"input": [[-1, -2, -3, -4]], "expected": -1},
-                {"input": [[5]], "expected": 5}
-            ]
-        },
-        # Add more question IDs and their test cases here
+    return TEST_CASE_REGISTRY.get(question_id, {"function_name": "", "cases": []})
+
+
+def _encode_input(value):
+    """Return (digest, input frame, artifact refs by argument position, artifact bytes).
+
+    ArrayArtifact arguments are sent as None and referenced by path instead, so
+    the harness maps the file rather than receiving the array over the pipe.
+    """
+    entry = _encoded_inputs.get(id(value))
+    if entry is None or entry[0] is not value:
+        artifacts = {i: arg.ref() for i, arg in enumerate(value) if isinstance(arg, ArrayArtifact)}
+        nbytes = sum(arg.nbytes for arg in value if isinstance(arg, ArrayArtifact))
+        plain = [None if isinstance(arg, ArrayArtifact) else arg for arg in value] if artifacts else value
+        input_digest = digest(plain)
+        entry = (value, input_digest, encode_frame(("input", {"digest": input_digest, "value": plain})),
+                 artifacts, nbytes)
+        _encoded_inputs[id(value)] = entry
+    return entry[1:]
+
+
+def _display_input(value):
+    return [arg.describe() if isinstance(arg, ArrayArtifact) else arg for arg in value]
+
+
+def _encode_job(source, function_name, cases, repeat, stop_on_failure=False, profile=False):
+    """Serialize a harness job: each distinct input once, cases reference inputs by digest.
+
+    With profile, the harness also profiles the case with the largest encoded input.
+    """
+    frames = []
+    sent = set()
+    case_frames = []
+    input_sizes = []
+    for case in cases:
+        input_digest, input_frame, artifacts, artifact_bytes = _encode_input(case["input"])
+        input_sizes.append(len(input_frame) + artifact_bytes)
+        if input_digest not in sent:
+            sent.add(input_digest)
+            frames.append(input_frame)
+        payload = {key: value for key, value in case.items() if key != "input"}
+        payload["input_ref"] = input_digest
+        if artifacts:
+            payload["artifacts"] = artifacts
+        case_frames.append(encode_frame(("case", payload)))
+
+    profile_index = input_sizes.index(max(input_sizes)) if profile and cases else None
+    job = encode_frame(("job", {"source": source, "function_name": function_name, "repeat": repeat,
+                                "stop_on_failure": stop_on_failure, "profile_index": profile_index}))
+    return b"".join([job] + frames + case_frames)
+
+
+def _run_harness(source, function_name, cases, repeat=1, stop_on_failure=False, profile=False):
+    """Run cases in a separate process via sandbox_runner.py and return
+    (per-case results, fatal error, profile report or None).
+
+    With stop_on_failure the harness stops at the first failing case and the
+    cases it never reached come back as None.
+    """
+    job = _encode_job(source, function_name, cases, repeat, stop_on_failure, profile)
+    # Outer timeout only guards against a wedged harness; per-case limits are enforced inside it
+    timeout = sum((case.get("time_limit") or DEFAULT_TIME_LIMIT) * repeat for case in cases) + 10
+    if profile:
+        # The profiled re-run may take a few times its case's limit under the profilers
+        timeout += max((case.get("time_limit") or DEFAULT_TIME_LIMIT) for case in cases) * PROFILE_TIMEOUT_FACTOR
+    result = run_harness(HARNESS_PATH, job, timeout)
+
+    outcomes = {}
+    profile_report = None
+    try:
+        # A killed or over-cap harness can leave a half-written last frame
+        partial = result.timed_out or "stdout" in result.truncated
+        for kind, payload in read_frames(result.stdout, safe=True, partial=partial):
+            if kind == "fatal":
+                return [], payload, None
+            if kind == "profile":
+                profile_report = payload
+            else:
+                outcomes[payload["index"]] = payload
+    except (ProtocolError, ValueError) as e:
+        return [], f"Malformed output from test harness: {str(e)}", None
+
+    if result.timed_out:
+        # Code that defeats the per-case alarm runs until the outer timeout: keep the
+        # verdicts that arrived and charge the case that was running with its limit
+        running = next((i for i in range(len(cases)) if i not in outcomes), None)
+        if running is not None:
+            outcomes[running] = {"verdict": "Time Limit Exceeded", "passed": False, "index": running,
+                                 "time": cases[running].get("time_limit") or DEFAULT_TIME_LIMIT}
+        missing = None if stop_on_failure else {"verdict": "Runtime Error", "passed": False,
+                                                "error": "Not run: the test harness was stopped after a time limit"}
+        return [outcomes.get(i, missing) for i in range(len(cases))], None, profile_report
+
+    if len(outcomes) < len(cases) and result.returncode != 0:
+        stderr = result.stderr.decode(errors="replace")
+        return [], f"Test harness crashed: {stderr.strip()[-500:]}", None
+    missing = None if stop_on_failure else {"verdict": "Runtime Error", "error": "No result", "passed": False}
+    return [outcomes.get(i, missing) for i in range(len(cases))], None, profile_report
+
+
+def _store_results(results):
+    global _stored_bytes
+    run_id = uuid.uuid4().hex
+    blob = pickle.dumps(results, protocol=5)
+    with _stored_lock:
+        _stored_results[run_id] = blob
+        _stored_bytes += len(blob)
+        while _stored_bytes > MAX_STORED_BYTES and len(_stored_results) > 1:
+            _, evicted = _stored_results.popitem(last=False)
+            _stored_bytes -= len(evicted)
+    return run_id
+
+
+def get_full_value(run_id, test_case, field):
+    """Return the untruncated input/expected/actual of a stored test case, or NOT_FOUND if unknown.
+
+    None is a legitimate value (e.g. a function that returned nothing), hence the sentinel.
+    Outputs over sandbox_protocol.MAX_VALUE_BYTES were summarized by the harness and stay so.
+    """
+    with _stored_lock:
+        blob = _stored_results.get(run_id)
+    for result in pickle.loads(blob) if blob is not None else []:
+        if result["test_case"] == test_case:
+            return result.get(field, NOT_FOUND)
+    return NOT_FOUND
+
+
+def summarize_results(results):
+    """Replace large input/expected/actual values with a preview and digest."""
+    summarized = []
+    for result in results:
+        result = dict(result)
+        for field in ("input", "expected", "actual"):
+            if field in result:
+                result[field] = summarize_value(result[field])
+        summarized.append(result)
+    return summarized
+
+
+def get_reference_baseline(question_id):
+    """Measure the reference solution on the stress cases once and cache expected outputs and times."""
+    if question_id in _reference_baselines:
+        return _reference_baselines[question_id]
+
+    test_cases = get_test_cases(question_id)
+    stress_cases = test_cases.get("stress_cases", [])
+    if not stress_cases or not test_cases.get("reference_solution"):
+        return None
+
+    outcomes, fatal, _ = _run_harness(test_cases["reference_solution"], test_cases["function_name"],
+                                   [{"input": case["input"]} for case in stress_cases],
+                                   repeat=REFERENCE_REPEATS)
+    if fatal or any("actual" not in outcome for outcome in outcomes):
+        raise RuntimeError(f"Reference solution failed for question ID {question_id}: {fatal or outcomes}")
+
+    baseline = {
+        "times": [outcome["time"] for outcome in outcomes],
+        "expected": [outcome["actual"] for outcome in outcomes],
     }
-    
-    return test_case_map.get(question_id, {"function_name": "", "cases": []})
+    _reference_baselines[question_id] = baseline
+    return baseline
+
+
+def time_limit_for(reference_time, multiplier=TIME_LIMIT_MULTIPLIER):
+    return max(MIN_TIME_LIMIT, reference_time * multiplier)
+
+
+def order_cases(session_id, question_id, total):
+    """Case indexes to run: those that failed last time for this session first, then the rest in order."""
+    previously_failed = _failed_cases.get((session_id, question_id), []) if session_id else []
+    first = [i for i in previously_failed if i < total]
+    return first + [i for i in range(total) if i not in first]
 
-def run_test_cases(module_path, test_cases, question_id):
-    """Import the user's module and run test cases against it."""
-    if not test_cases or "function_name" not in test_cases:
+
+def record_failures(session_id, question_id, ran, failed):
+    """Update the remembered failures with the outcome of the cases that actually ran."""
+    if not session_id:
+        return
+    key = (session_id, question_id)
+    previous = [i for i in _failed_cases.get(key, []) if i not in ran]
+    _failed_cases[key] = failed + previous
+    _failed_cases.move_to_end(key)
+    while len(_failed_cases) > MAX_TRACKED_SUBMISSIONS:
+        _failed_cases.popitem(last=False)
+
+
+def run_test_cases(source, test_cases, question_id, session_id=None, quick_check=False, profile=False):
+    """Run the user's source against the test cases (and stress cases, if any) in the sandbox harness.
+
+    Cases that failed on this session's previous submission run first. With
+    quick_check the run stops at the first failure; if nothing fails it goes on
+    to cover the full suite. With profile, the largest case is also profiled and
+    the hot-spot report is returned under "profile".
+    """
+    if not test_cases or "function_name" not in test_cases or not test_cases["cases"]:
         return {"success": False, "error": f"No test cases defined for question ID {question_id}"}
-    
+
     function_name = test_cases["function_name"]
-    cases = test_cases["cases"]
-    
+    cases = [dict(case, time_limit=DEFAULT_TIME_LIMIT) for case in test_cases["cases"]]
+
     try:
-        # Import the module
-        spec = importlib.util.spec_from_file_location("user_module", module_path)
-        user_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(user_module)
-        
-        # Get the function
-        if not hasattr(user_module, function_name):
-            return {"success": False, "error": f"Function '{function_name}' not found in your code"}
-        
-        user_function = getattr(user_module, function_name)
-        
-        # Run test cases
+        baseline = get_reference_baseline(question_id)
+        if baseline:
+            multiplier = test_cases.get("time_limit_multiplier", TIME_LIMIT_MULTIPLIER)
+            for case, expected, reference_time in zip(test_cases["stress_cases"], baseline["expected"], baseline["times"]):
+                cases.append({"input": case["input"], "expected": expected, "stress": True,
+                              "time_limit": time_limit_for(reference_time, multiplier)})
+
+        order = order_cases(session_id, question_id, len(cases))
+        outcomes, fatal, profile_report = _run_harness(source, function_name, [cases[i] for i in order],
+                                                       stop_on_failure=quick_check, profile=profile)
+        if fatal:
+            return {"success": False, "error": fatal}
+
+        # Results are reported in the order the cases ran
         results = []
         passed = 0
-        
-        for i, case in enumerate(cases):
-            try:
-                actual_output = user_function(*case["input"])
-                matches = actual_output == case["expected"]
-                
-                if matches:
-                    passed += 1
-                
-                results.append({
-                    "test_case": i + 1,
-                    "input": case["input"],
-                    "expected": case["expected"],
-                    "actual": actual_output,
-                    "passed": matches
-                })
-            except Exception as e:
-                results.append({
-                    "test_case": i + 1,
-                    "input": case["input"],
-                    "error": str(e),
-                    "passed": False
-                })
-        
+
+        for i, outcome in zip(order, outcomes):
+            if outcome is None:
+                continue
+            case = cases[i]
+            if outcome.get("passed"):
+                passed += 1
+
+            result = {
+                "test_case": i + 1,
+                "input": _display_input(case["input"]),
+                "passed": outcome.get("passed", False),
+                "verdict": outcome.get("verdict"),
+                "time": outcome.get("time"),
+                "time_limit": case["time_limit"],
+                "stress": case.get("stress", False)
+            }
+            if "actual" in outcome:
+                result["expected"] = case["expected"]
+                result["actual"] = outcome["actual"]
+            if "error" in outcome:
+                result["error"] = outcome["error"]
+            results.append(result)
+
+        record_failures(session_id, question_id,
+                        ran=[r["test_case"] - 1 for r in results],
+                        failed=[r["test_case"] - 1 for r in results if not r["passed"]])
+
+        if profile_report:
+            profile_report["test_case"] = order[profile_report.pop("case_index")] + 1
+
         return {
             "success": True,
             "passed": passed,
             "total": len(cases),
-            "results": results
+            "ran": len(results),
+            "profile": profile_report,
+            "quick_check": quick_check,
+            "stopped_early": len(results) < len(cases),
+            "run_id": _store_results(results),
+            "results": summarize_results(results)
         }
-    
+
     except Exception as e:
         return {"success": False, "error": f"Error running test cases: {str(e)}"}
 
@@ -131,4 +397,19 @@ def max_subarray_sum(nums):
 """
     
     result = evaluate_code("python", user_code, 1)
-    print(json.dumps(result, indent=2))
\ No newline at end of file
+    print(json.dumps(result, indent=2))
+
+    # Soak test: python code_evaluator.py --soak 10000
+    # Checks that repeated evaluations leave nothing behind in the temp directory
+    if len(sys.argv) == 3 and sys.argv[1] == "--soak":
+        import tempfile
+        runs = int(sys.argv[2])
+        temp_dir = tempfile.gettempdir()
+        before = set(os.listdir(temp_dir))
+        for i in range(runs):
+            evaluate_code("python", user_code, 1)
+            if (i + 1) % 1000 == 0:
+                print(f"{i + 1} runs, {len(set(os.listdir(temp_dir)) - before)} new temp entries")
+        leaked = set(os.listdir(temp_dir)) - before
+        print(f"Soak test: {runs} runs, {len(leaked)} new entries in {temp_dir}")
+        sys.exit(1 if leaked else 0)
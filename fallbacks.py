@@ -0,0 +1,124 @@
+# fallbacks.py
+# Degraded responses served when the LLM is unavailable (breaker open, deadline
+# missed or upstream errors): questions from the local bank, rubric-template
+# feedback and canned follow-ups. Endpoints flag these with "degraded": True.
+import random
+import threading
+from collections import Counter
+
+import question_bank
+
+UNAVAILABLE_NOTE = "AI feedback is temporarily unavailable, so this is a rubric-based review."
+
+TEXT_RUBRIC = [
+    "Answers the question that was asked, directly and early",
+    "Explains the approach step by step rather than only naming it",
+    "Justifies the key decisions and mentions the trade-offs",
+    "Covers edge cases, failure modes or limitations",
+    "Gives a concrete example or past experience where relevant",
+]
+
+CODE_RUBRIC = [
+    "Correctness: check the failing test cases above and the edge cases (empty, single element, duplicates, negatives)",
+    "Efficiency: state the time and space complexity and whether a single pass or a better data structure would do",
+    "Readability: descriptive names, small functions, no dead code",
+    "Robustness: validate inputs and handle errors explicitly",
+]
+
+SQL_RUBRIC = [
+    "Correctness: check the failing test cases above, plus NULLs, ties and groups with no matching rows",
+    "Efficiency: which indexes the query can use, and whether a subquery or extra scan can be avoided",
+    "Readability: explicit JOIN ... ON clauses, meaningful aliases, one clause per line",
+]
+
+FOLLOW_UPS = [
+    "What trade-offs did you consider, and why did you choose this approach?",
+    "How would your answer change if the scale grew by 100x?",
+    "What are the main failure modes or edge cases, and how would you handle them?",
+    "How would you test or validate this in practice?",
+    "What would you do differently with more time?",
+]
+
+# Interview mode (the UI's topic list) -> bank skills; mode names themselves rarely match skill aliases
+MODE_SKILLS = {
+    "Data Science & ML": ["machine learning", "statistics", "mlops", "data engineering"],
+    "Software Engineering & System Design": ["system design", "distributed systems", "api design", "microservices", "caching"],
+    "Data Structures & Algorithms": ["algorithms"],
+    "Database & SQL Queries": ["sql", "databases"],
+    "Networking & OS": ["networking", "operating systems"],
+    "Behavioral & HR": ["communication", "collaboration", "leadership", "ownership"],
+    "Cloud Computing & DevOps": ["cloud", "aws", "devops", "docker", "kubernetes", "ci/cd", "observability"],
+}
+
+CODE_FOLLOW_UPS = [
+    "What is the time and space complexity of your solution?",
+    "Which edge cases does your code handle, and which might it miss?",
+    "How would you change the solution if the input didn't fit in memory?",
+]
+
+SQL_FOLLOW_UPS = [
+    "Which index would speed up your query, and why?",
+    "How does your query behave with NULLs or ties?",
+]
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def _record(kind):
+    with _lock:
+        _stats[kind] += 1
+
+
+def question_for(mode, difficulty):
+    """A bank question tagged with the mode's skills, at the requested difficulty when the bank has one."""
+    _record("generate_question")
+    bank = question_bank.get_bank()
+    candidates = bank.with_skills(MODE_SKILLS.get(mode) or question_bank.detect_skills(mode))
+    if not candidates:
+        candidates = [entry for _, entry in bank.search(mode, k=5, min_similarity=0.0)]
+    # Generated entries carry no difficulty, so they're only used when no curated one matches
+    at_level = [entry for entry in candidates if entry.get("difficulty") == difficulty]
+    return random.choice(at_level or candidates)["question"]
+
+
+def text_feedback(features):
+    """Rubric checklist plus the pre-scorer's signals in place of LLM feedback on a text answer."""
+    _record("evaluate_text_answer")
+    shared = ", ".join(features["shared_terms"]) or "none"
+    checklist = "\n".join(f"- {item}" for item in TEXT_RUBRIC)
+    return (f"{UNAVAILABLE_NOTE}\n\n"
+            f"Your answer has {features['word_count']} words and shares these key terms with the question: {shared}.\n\n"
+            f"Check your answer against this rubric:\n{checklist}\n\n"
+            "Rating: not available")
+
+
+def follow_ups(count=2):
+    _record("follow_up_questions")
+    return random.sample(FOLLOW_UPS, count)
+
+
+def code_feedback(profile_report=None, language="python"):
+    """Rubric checklist for code, pointing at measured hot spots when a profiling report is available."""
+    _record("feedback_on_code")
+    lines = [UNAVAILABLE_NOTE, "", "Review your solution against this rubric:"]
+    if language == "sql":
+        lines.extend(f"- {item}" for item in SQL_RUBRIC)
+        return {"feedback_text": "\n".join(lines), "follow_up_questions": list(SQL_FOLLOW_UPS)}
+    lines.extend(f"- {item}" for item in CODE_RUBRIC)
+    hot_lines = (profile_report or {}).get("hot_lines") or []
+    if hot_lines:
+        lines.extend(["", "Where your solution spent its time on the largest test:"])
+        lines.extend(f"- line {row['line']} ({row['share']:.0%} of samples): `{row['code']}`" for row in hot_lines)
+    return {"feedback_text": "\n".join(lines), "follow_up_questions": list(CODE_FOLLOW_UPS[:2])}
+
+
+def design_feedback(label, keywords):
+    _record("assess_design")
+    return (f"Automated assessment of {label.lower()} is temporarily unavailable. "
+            f"Check that your answer addresses: {', '.join(keywords[:6])}.")
+
+
+def get_stats():
+    with _lock:
+        return dict(_stats)
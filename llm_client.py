@@ -0,0 +1,211 @@
+# llm_client.py
+# Shared call path for LLM requests made by the backend modules. Calls go through
+# a circuit breaker: after repeated failures or missed deadlines it opens and
+# requests fail fast with LLMUnavailable, so endpoints serve degraded answers
+# while a background probe waits for the upstream to recover.
+import time
+import hashlib
+import threading
+from collections import Counter
+
+import model_router
+
+COALESCE_WAIT_TIMEOUT = 120  # seconds a follower waits on an in-flight call before giving up
+FAILURE_THRESHOLD = 3  # consecutive failed upstream calls that open the breaker
+PROBE_INTERVAL = 5.0  # seconds before the first recovery probe; doubles after each failed probe
+MAX_PROBE_INTERVAL = 60.0
+
+
+class LLMUnavailable(Exception):
+    """The LLM can't answer this request: the breaker is open, or the call failed or missed its deadline."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False  # leader was interrupted before producing a result
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it is in flight wait and receive the same result, or the same
+    exception if it fails. If the leader is interrupted (KeyboardInterrupt,
+    cancellation, ...) the waiters retry rather than inherit the interruption.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = Counter()
+
+    def do(self, key, fn, timeout=COALESCE_WAIT_TIMEOUT):
+        with self._lock:
+            self.stats["requests"] += 1
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    leader = True
+                    self.stats["upstream_calls"] += 1
+                else:
+                    leader = False
+                    call.waiters += 1
+                    self.stats["coalesced"] += 1
+
+            if leader:
+                return self._lead(key, call, fn)
+
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self.stats["wait_timeouts"] += 1
+                raise TimeoutError("Timed out waiting for an identical in-flight LLM request")
+            if call.abandoned:
+                with self._lock:
+                    self.stats["retried_after_abandon"] += 1
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    def _lead(self, key, call, fn):
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+                if call.waiters:
+                    self.stats["errors_shared"] += call.waiters
+            raise
+        except BaseException:
+            call.abandoned = True
+            with self._lock:
+                self.stats["abandoned"] += 1
+            raise
+        finally:
+            # Unregister before waking waiters so later arrivals start a fresh call
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class CircuitBreaker:
+    """Closed: calls go through. Open: calls are rejected immediately. Half-open:
+    the background probe is testing the upstream; calls are still rejected so
+    no user request waits on a possibly dead upstream.
+
+    Opening starts a daemon thread that probes with backoff and closes the
+    breaker on the first successful probe.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, probe, failure_threshold=FAILURE_THRESHOLD, probe_interval=PROBE_INTERVAL,
+                 max_probe_interval=MAX_PROBE_INTERVAL):
+        self._lock = threading.Lock()
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.max_probe_interval = max_probe_interval
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.stats = Counter()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state != self.CLOSED or self.failures < self.failure_threshold:
+                return
+            self.state = self.OPEN
+            self.opened_at = time.time()
+            self.stats["trips"] += 1
+        threading.Thread(target=self._probe_until_recovered, name="llm-breaker-probe", daemon=True).start()
+
+    def _probe_until_recovered(self):
+        interval = self.probe_interval
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                self.state = self.HALF_OPEN
+                self.stats["probes"] += 1
+            healthy = self.probe()
+            with self._lock:
+                if healthy:
+                    self.state = self.CLOSED
+                    self.failures = 0
+                    self.opened_at = None
+                    self.stats["recoveries"] += 1
+                    return
+                self.state = self.OPEN
+            interval = min(interval * 2, self.max_probe_interval)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, state=self.state, consecutive_failures=self.failures,
+                        open_for_s=round(time.time() - self.opened_at, 1) if self.opened_at else None)
+
+
+_single_flight = SingleFlight()
+breaker = CircuitBreaker(model_router.probe)
+
+
+def request_key(task, messages):
+    """Identity of a request: the task (which fixes the model route) plus the full message list."""
+    digest = hashlib.sha256(task.encode())
+    for message in messages:
+        digest.update(b"\0" + type(message).__name__.encode() + b"\0" + str(message.content).encode())
+    return digest.hexdigest()
+
+
+def _call_upstream(task, messages):
+    try:
+        response = model_router.route(task, messages)
+    except model_router.Overloaded as e:
+        # Local queueing says nothing about the upstream's health: don't trip the breaker on it
+        raise LLMUnavailable(f"LLM request for '{task}' failed: {str(e)}") from e
+    except Exception as e:
+        breaker.record_failure()
+        raise LLMUnavailable(f"LLM request for '{task}' failed: {str(e)}") from e
+    breaker.record_success()
+    return response
+
+
+def invoke(task, messages, coalesce=True):
+    """Run a task through the model router, sharing one upstream call among identical concurrent requests.
+
+    Pass coalesce=False where identical prompts are expected to yield different
+    answers (e.g. question generation), so concurrent users don't share one.
+    Raises LLMUnavailable when the breaker is open or the call fails or misses
+    its deadline; callers catch it and serve a degraded response.
+    """
+    if not breaker.allow():
+        raise LLMUnavailable(f"LLM is unavailable (circuit {breaker.state}); task '{task}' not sent")
+    if not coalesce:
+        return _call_upstream(task, messages)
+    return _single_flight.do(request_key(task, messages), lambda: _call_upstream(task, messages))
+
+
+def get_stats():
+    with _single_flight._lock:
+        stats = dict(_single_flight.stats)
+        stats["in_flight"] = len(_single_flight._calls)
+    return stats
@@ -0,0 +1,310 @@
+# model_router.py
+# Maps each LLM task to a model tier and latency SLO. If the primary tier hasn't
+# answered within the task's p95 budget, a hedged request goes to a faster tier
+# and the first acceptable answer wins. Each task also has a hard deadline after
+# which the request fails with DeadlineExceeded rather than waiting on the client.
+# Budgets count from when the primary attempt starts, not from when it was queued.
+import os
+import time
+import threading
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODEL_TIERS = {
+    "fast": {
+        "model": os.getenv("LLM_FAST_MODEL", "gpt-4o-mini"),
+        "temperature": 0.7,
+        "cost_per_1k_input": 0.00015,
+        "cost_per_1k_output": 0.0006,
+    },
+    "standard": {
+        "model": os.getenv("LLM_STANDARD_MODEL", "gpt-4o-mini"),
+        "temperature": 0.7,
+        "cost_per_1k_input": 0.00015,
+        "cost_per_1k_output": 0.0006,
+    },
+    "heavy": {
+        "model": os.getenv("LLM_HEAVY_MODEL", "gpt-4o"),
+        "temperature": 0.7,
+        "cost_per_1k_input": 0.0025,
+        "cost_per_1k_output": 0.01,
+    },
+}
+
+# slo_p95 is the latency budget (seconds) after which a hedge is sent to hedge_tier;
+# deadline is when the request gives up so the endpoint can serve a degraded answer
+TASK_ROUTES = {
+    "generate_question": {"tier": "standard", "slo_p95": 6.0, "hedge_tier": "fast", "deadline": 12.0},
+    "generate_jd_questions": {"tier": "standard", "slo_p95": 8.0, "hedge_tier": "fast", "deadline": 15.0},
+    "follow_up_questions": {"tier": "fast", "slo_p95": 3.0, "hedge_tier": None, "deadline": 6.0},
+    "evaluate_text_answer": {"tier": "standard", "slo_p95": 8.0, "hedge_tier": "fast", "deadline": 15.0},
+    "feedback_on_code": {"tier": "standard", "slo_p95": 10.0, "hedge_tier": "fast", "deadline": 20.0},
+    "assess_design": {"tier": "heavy", "slo_p95": 20.0, "hedge_tier": "standard", "deadline": 40.0},
+    "grade_follow_ups": {"tier": "standard", "slo_p95": 10.0, "hedge_tier": "fast", "deadline": 20.0},
+}
+DEFAULT_ROUTE = {"tier": "standard", "slo_p95": 10.0, "hedge_tier": None, "deadline": 20.0}
+UPSTREAM_TIMEOUT = 45.0  # client timeout, so attempts abandoned at a deadline still finish eventually
+PROBE_TIMEOUT = 5.0
+PROBE_PROMPT = "Reply with OK."
+
+CACHED_INPUT_PRICE_RATIO = 0.5  # providers bill prompt-cache hits at a discount
+LATENCY_WINDOW = 200  # recent samples kept per task for percentiles
+MIN_SAMPLES_FOR_P95 = 20  # below this, hedge on the configured SLO alone
+# Routed requests in flight at once across all endpoints; a design assessment alone
+# fans out one per rubric dimension (system_design_assessor sizes its pool to match)
+MAX_CONCURRENT_REQUESTS = 64
+
+# A primary and possibly a hedge per request
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS * 2, thread_name_prefix="llm")
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Overloaded(DeadlineExceeded):
+    """No worker was free to start the request within its deadline; upstream was never called."""
+
+
+class ScriptedResponse:
+    def __init__(self, content, input_tokens=0, output_tokens=0, cached_tokens=0):
+        self.content = content
+        self.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                               "input_token_details": {"cache_read": cached_tokens}}
+        self.response_metadata = {}
+
+
+class ScriptedBackend:
+    """Offline stand-in for a chat model: each invoke sleeps for the next scripted
+    latency (the last one repeats) and returns the reply, or raises if the reply
+    is an exception instance."""
+
+    def __init__(self, latencies, reply="ok", input_tokens=100, output_tokens=50):
+        self.latencies = list(latencies)
+        self.reply = reply
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, messages):
+        with self._lock:
+            latency = self.latencies[min(self.calls, len(self.latencies) - 1)]
+            self.calls += 1
+        time.sleep(latency)
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return ScriptedResponse(self.reply, self.input_tokens, self.output_tokens)
+
+
+def _build_backend(tier):
+    from langchain_openai import ChatOpenAI
+
+    config = MODEL_TIERS[tier]
+    return ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"), model=config["model"],
+                      temperature=config["temperature"], timeout=UPSTREAM_TIMEOUT, max_retries=1)
+
+
+def get_backend(tier):
+    with _backends_lock:
+        if tier not in _backends:
+            _backends[tier] = _build_backend(tier)
+        return _backends[tier]
+
+
+def set_backend(tier, backend):
+    """Override the backend for a tier (e.g. with a ScriptedBackend for offline runs)."""
+    with _backends_lock:
+        _backends[tier] = backend
+
+
+class RouterMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.counters = defaultdict(lambda: defaultdict(int))
+        self.cost = defaultdict(float)
+        # task -> [total latency, count] split by whether the provider reported a prompt-cache hit
+        self.cache_latency = defaultdict(lambda: {"hit": [0.0, 0], "miss": [0.0, 0]})
+
+    def record_attempt(self, task, tier, latency, response=None):
+        with self._lock:
+            counters = self.counters[task]
+            counters[f"{tier}_calls"] += 1
+            if response is None:
+                counters["errors"] += 1
+                return
+            input_tokens, output_tokens, cached_tokens = _token_usage(response)
+            counters["input_tokens"] += input_tokens
+            counters["cached_input_tokens"] += cached_tokens
+            counters["output_tokens"] += output_tokens
+            bucket = self.cache_latency[task]["hit" if cached_tokens else "miss"]
+            bucket[0] += latency
+            bucket[1] += 1
+            self.cost[task] += _response_cost(tier, input_tokens, output_tokens, cached_tokens)
+
+    def record_request(self, task, latency, slo, hedged, hedge_won, deadline_exceeded=False, overloaded=False):
+        with self._lock:
+            counters = self.counters[task]
+            counters["requests"] += 1
+            if overloaded:
+                counters["overloaded"] += 1
+                return
+            self.latencies[task].append(latency)
+            counters["slo_violations"] += latency > slo
+            counters["hedged"] += hedged
+            counters["hedge_wins"] += hedge_won
+            counters["deadline_exceeded"] += deadline_exceeded
+
+    def p95(self, task, min_samples=MIN_SAMPLES_FOR_P95):
+        with self._lock:
+            samples = self.latencies[task]
+            return _percentile(samples, 0.95) if len(samples) >= min_samples else None
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                task: dict(counters,
+                           p50_latency=_percentile(self.latencies[task], 0.5),
+                           p95_latency=_percentile(self.latencies[task], 0.95),
+                           cost_usd=round(self.cost[task], 6),
+                           cache_hit_rate=_ratio(counters["cached_input_tokens"], counters["input_tokens"]),
+                           avg_latency_cache_hit=_ratio(*self.cache_latency[task]["hit"]),
+                           avg_latency_cache_miss=_ratio(*self.cache_latency[task]["miss"]))
+                for task, counters in self.counters.items()
+            }
+
+
+def _percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def _token_usage(response):
+    """(input, output, cached input) token counts from a LangChain or raw OpenAI response."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0), cached
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), cached
+
+
+def _response_cost(tier, input_tokens, output_tokens, cached_tokens=0):
+    config = MODEL_TIERS[tier]
+    billed_input = input_tokens - cached_tokens + cached_tokens * CACHED_INPUT_PRICE_RATIO
+    return (billed_input * config["cost_per_1k_input"] + output_tokens * config["cost_per_1k_output"]) / 1000
+
+
+metrics = RouterMetrics()
+
+
+def _is_acceptable(response):
+    return bool(getattr(response, "content", "").strip())
+
+
+def _started(event, task, tier, messages):
+    event.set()
+    return _attempt(task, tier, messages)
+
+
+def _attempt(task, tier, messages):
+    start = time.perf_counter()
+    try:
+        response = get_backend(tier).invoke(messages)
+    except Exception:
+        metrics.record_attempt(task, tier, time.perf_counter() - start)
+        raise
+    metrics.record_attempt(task, tier, time.perf_counter() - start, response)
+    return response
+
+
+def hedge_delay(task, config):
+    """Hedge at the SLO budget, or earlier if the task's observed p95 is already tighter."""
+    observed = metrics.p95(task)
+    return config["slo_p95"] if observed is None else min(config["slo_p95"], observed)
+
+
+def route(task, messages):
+    """Invoke the task's primary tier, hedging to a faster tier once the SLO budget is spent.
+
+    Raises DeadlineExceeded if no acceptable answer arrives by the task's deadline;
+    attempts still in flight are left to finish (or time out) in the background.
+    Raises Overloaded if the primary attempt couldn't even start within the deadline.
+    """
+    config = TASK_ROUTES.get(task, DEFAULT_ROUTE)
+    delay = hedge_delay(task, config)
+    deadline = config["deadline"]
+    started = threading.Event()
+    queued = time.perf_counter()
+    primary = _executor.submit(_started, started, task, config["tier"], messages)
+    if not started.wait(deadline):
+        primary.cancel()
+        metrics.record_request(task, time.perf_counter() - queued, config["slo_p95"], False, False, overloaded=True)
+        raise Overloaded(f"Task '{task}' waited {deadline:.0f}s for a free worker")
+    start = time.perf_counter()
+    pending = {primary: "primary"}
+    hedged = False
+    last_error = None
+
+    while pending:
+        remaining = deadline - (time.perf_counter() - start)
+        if remaining <= 0:
+            metrics.record_request(task, time.perf_counter() - start, config["slo_p95"], hedged, False,
+                                   deadline_exceeded=True)
+            raise DeadlineExceeded(f"Task '{task}' got no answer within its {deadline:.0f}s deadline")
+        timeout = remaining
+        if not hedged and config["hedge_tier"]:
+            timeout = min(timeout, max(0.0, delay - (time.perf_counter() - start)))
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            role = pending.pop(future)
+            try:
+                response = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            if _is_acceptable(response):
+                metrics.record_request(task, time.perf_counter() - start, config["slo_p95"],
+                                       hedged, role == "hedge")
+                return response
+            last_error = ValueError(f"Empty response from {role} model for task '{task}'")
+
+        # Hedge once: either the primary missed its budget or failed outright
+        if (not hedged and config["hedge_tier"] and (not done or not pending)
+                and time.perf_counter() - start < deadline):
+            hedged = True
+            pending[_executor.submit(_attempt, task, config["hedge_tier"], messages)] = "hedge"
+
+    metrics.record_request(task, time.perf_counter() - start, config["slo_p95"], hedged, False)
+    raise last_error
+
+
+def probe(timeout=PROBE_TIMEOUT):
+    """Cheap health check against the fast tier; True if it answered in time."""
+    # Its own thread, so a hung upstream can't park a worker of the shared request pool
+    result = {}
+
+    def attempt():
+        try:
+            result["ok"] = _is_acceptable(get_backend("fast").invoke(PROBE_PROMPT))
+        except Exception:
+            result["ok"] = False
+
+    thread = threading.Thread(target=attempt, name="llm-probe", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return result.get("ok", False)
@@ -0,0 +1,116 @@
+# prescorer.py
+# CPU-only pre-scoring of text answers, run before the LLM. Answers that are
+# near-empty or a copy of the question get instant templated feedback; everything
+# else goes to the LLM with the computed features attached.
+import time
+import threading
+from collections import Counter
+
+from text_vectors import tokenize, hashing_vector, cosine
+import model_router
+
+MIN_WORDS = 3  # fewer words than this is treated as an empty-ish answer
+DUPLICATE_CONTAINMENT = 0.9  # share of answer terms that also appear in the question
+# ...and share of question terms the answer repeats: picking one side of an either/or
+# question ("A queue for BFS.") uses only question terms but doesn't restate it
+DUPLICATE_COVERAGE = 0.9
+# Below this overlap the prompt gets a hint; short correct answers often share no
+# words with the question ("A hash map plus a doubly linked list."), so it never skips
+LOW_OVERLAP_SIMILARITY = 0.01
+
+_lock = threading.Lock()
+_stats = Counter()
+_latency_saved = 0.0
+_prescore_time = 0.0
+
+
+def compute_features(answer, question):
+    answer_terms = tokenize(answer)
+    question_terms = tokenize(question)
+    answer_set, question_set = set(answer_terms), set(question_terms)
+    shared = answer_set & question_set
+    return {
+        "word_count": len(answer.split()),
+        "unique_terms": len(answer_set),
+        "keyword_overlap": round(cosine(hashing_vector(answer), hashing_vector(question)), 3),
+        "question_containment": round(len(shared) / len(answer_set), 3) if answer_set else 0.0,
+        "question_coverage": round(len(shared) / len(question_set), 3) if question_set else 0.0,
+        "shared_terms": sorted(shared)[:10],
+    }
+
+
+def _skip_reason(question, features):
+    if features["word_count"] < MIN_WORDS or not features["unique_terms"]:
+        return "too_short"
+    if (features["question_containment"] >= DUPLICATE_CONTAINMENT
+            and features["question_coverage"] >= DUPLICATE_COVERAGE
+            and features["word_count"] <= len(question.split()) * 1.2):
+        return "copies_question"
+    return None
+
+
+TEMPLATED_FEEDBACK = {
+    "too_short": "The answer is too short to evaluate. A strong answer explains the approach, "
+                 "justifies the key decisions and mentions trade-offs or edge cases.",
+    "copies_question": "The answer mostly restates the question rather than answering it. "
+                       "Explain how you would solve the problem and why.",
+}
+
+TEMPLATED_FOLLOW_UPS = {
+    "too_short": ["Could you walk me through your answer in more detail?",
+                  "What trade-offs would you consider in your approach?"],
+    "copies_question": ["How would you actually approach this problem, step by step?",
+                        "What is the first thing you would check or build?"],
+}
+
+
+def prescore(answer, question, task):
+    """Return {"features", "skip", "reason"}; records skip rate and estimated latency saved for the task."""
+    global _latency_saved, _prescore_time
+    start = time.perf_counter()
+    features = compute_features(answer, question)
+    reason = _skip_reason(question, features)
+    elapsed = time.perf_counter() - start
+
+    # Latency saved is estimated from the task's observed median LLM latency
+    typical_latency = model_router.metrics.snapshot().get(task, {}).get("p50_latency") if reason else None
+    with _lock:
+        _stats[f"{task}_scored"] += 1
+        _prescore_time += elapsed
+        if reason:
+            _stats[f"{task}_skipped"] += 1
+            _stats[f"skipped_{reason}"] += 1
+            _latency_saved += typical_latency or 0.0
+    return {"features": features, "skip": reason is not None, "reason": reason}
+
+
+def templated_feedback(reason):
+    return f"{TEMPLATED_FEEDBACK[reason]}\n\nRating: 1/10"
+
+
+def templated_follow_ups(reason):
+    return list(TEMPLATED_FOLLOW_UPS[reason])
+
+
+def describe_features(features):
+    """One-line summary of the features for inclusion in an LLM prompt."""
+    shared = ", ".join(features["shared_terms"]) or "none"
+    summary = (f"Pre-computed signals: {features['word_count']} words, keyword overlap with the question "
+               f"{features['keyword_overlap']:.2f}, shared key terms: {shared}.")
+    if features["keyword_overlap"] < LOW_OVERLAP_SIMILARITY:
+        summary += (" The answer shares no key terms with the question: it may be off-topic, or correct"
+                    " in different words; judge it on substance.")
+    elif features["question_containment"] >= DUPLICATE_CONTAINMENT:
+        summary += (" The answer only uses terms from the question: it may restate it, or correctly pick"
+                    " one of the options it offers; judge it on substance.")
+    return summary
+
+
+def get_stats():
+    with _lock:
+        stats = dict(_stats)
+        for task in {key.rsplit("_", 1)[0] for key in _stats if key.endswith("_scored")}:
+            stats[f"{task}_skip_rate"] = round(_stats[f"{task}_skipped"] / _stats[f"{task}_scored"], 3)
+        stats["estimated_latency_saved_s"] = round(_latency_saved, 3)
+        stats["prescore_time_s"] = round(_prescore_time, 3)
+    return stats
@@ -0,0 +1,86 @@
+# prompt_templates.py
+# Versioned prompt templates laid out for provider-side prefix caching: the
+# static system text and instructions form the system message, and everything
+# request-specific goes last in the user message, so the long constant prefix is
+# byte-identical across requests.
+#
+# Templates live in prompts/<name>.v<version>.txt with "--- system ---",
+# "--- instructions ---" and "--- user ---" sections; only the user section is
+# formatted with request variables.
+import os
+import re
+import threading
+from langchain.schema import HumanMessage, SystemMessage
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+# Pin a template to a specific version here; otherwise the highest version is used
+PINNED_VERSIONS = {}
+
+_FILENAME_RE = re.compile(r"^(?P<name>[a-z0-9_]+)\.v(?P<version>\d+)\.txt$")
+_SECTION_RE = re.compile(r"^--- (system|instructions|user) ---$", re.MULTILINE)
+
+_templates = None
+_templates_lock = threading.Lock()
+
+
+class PromptTemplate:
+    def __init__(self, name, version, system, instructions, user):
+        self.name = name
+        self.version = version
+        self.system = system
+        self.instructions = instructions
+        self.user = user
+        # Built once so every request sends exactly the same prefix
+        self.prefix = f"{system}\n\n{instructions}"
+
+    def render(self, **variables):
+        return [SystemMessage(content=self.prefix), HumanMessage(content=self.user.format(**variables))]
+
+
+def _parse(name, version, text):
+    parts = _SECTION_RE.split(text)
+    sections = {parts[i]: parts[i + 1].strip() for i in range(1, len(parts) - 1, 2)}
+    missing = {"system", "instructions", "user"} - set(sections)
+    if missing:
+        raise ValueError(f"Prompt template {name}.v{version} is missing sections: {', '.join(sorted(missing))}")
+    return PromptTemplate(name, version, sections["system"], sections["instructions"], sections["user"])
+
+
+def _load_all():
+    candidates = {}
+    for filename in os.listdir(PROMPTS_DIR):
+        match = _FILENAME_RE.match(filename)
+        if match:
+            candidates.setdefault(match["name"], []).append((int(match["version"]), filename))
+
+    templates = {}
+    for name, versions in candidates.items():
+        pinned = PINNED_VERSIONS.get(name)
+        if pinned is None:
+            version, filename = max(versions)
+        else:
+            matches = [v for v in versions if v[0] == pinned]
+            if not matches:
+                raise ValueError(f"Prompt template {name} has no version {pinned}")
+            version, filename = matches[0]
+        with open(os.path.join(PROMPTS_DIR, filename)) as f:
+            templates[name] = _parse(name, version, f.read())
+    return templates
+
+
+def get_template(name):
+    """Return the template, loading all templates from disk on first use."""
+    global _templates
+    with _templates_lock:
+        if _templates is None:
+            _templates = _load_all()
+        return _templates[name]
+
+
+def render(name, **variables):
+    return get_template(name).render(**variables)
+
+
+def loaded_versions():
+    with _templates_lock:
+        return {name: template.version for name, template in (_templates or {}).items()}
@@ -0,0 +1,252 @@
+# question_bank.py
+# Local retrieval index over a curated + previously generated question bank.
+# Questions are embedded with hashed term vectors (text_vectors) and stored in a
+# NumPy matrix; generated rows are appended to a float32 file on disk that is
+# memory-mapped on startup, so the index survives restarts without re-embedding.
+import os
+import re
+import json
+import fcntl
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+from text_vectors import hashing_vector
+
+BANK_DIR = os.getenv("QUESTION_BANK_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "question_bank"))
+CURATED_PATH = os.path.join(BANK_DIR, "curated.json")
+GENERATED_PATH = os.path.join(BANK_DIR, "generated.jsonl")
+GENERATED_VECTORS_PATH = os.path.join(BANK_DIR, "generated.f32")
+USE_MMAP = os.getenv("QUESTION_BANK_MMAP", "1") != "0"
+
+INDEX_FEATURES = 2 ** 12  # smaller than the scorer's vectors; 16 KB per stored question
+MIN_SIMILARITY = 0.12  # below this a bank question is not considered relevant to the JD
+DUPLICATE_SIMILARITY = 0.9  # generated questions this close to an existing one aren't inserted
+ROW_BYTES = INDEX_FEATURES * 4  # one float32 vector in generated.f32
+
+# skill -> phrases that indicate it in a job description or question
+SKILL_ALIASES = {
+    "python": ["python", "django", "flask", "fastapi", "pandas"],
+    "sql": ["sql", "postgres", "postgresql", "mysql", "sqlite"],
+    "databases": ["database", "databases", "nosql", "mongodb", "dynamodb", "cassandra", "indexing"],
+    "distributed systems": ["distributed", "consensus", "replication", "high availability", "scalable systems"],
+    "system design": ["system design", "architecture", "scalability", "scalable", "design systems"],
+    "caching": ["cache", "caching", "redis", "memcached", "cdn"],
+    "api design": ["api", "apis", "rest api", "restful", "grpc", "graphql"],
+    "microservices": ["microservice", "microservices", "service-oriented"],
+    "kafka": ["kafka", "event streaming", "pub/sub", "message queue", "rabbitmq"],
+    "data engineering": ["etl", "elt", "data pipeline", "data pipelines", "airflow", "spark", "data warehouse"],
+    "machine learning": ["machine learning", "ml", "deep learning", "model training", "scikit-learn", "pytorch", "tensorflow"],
+    "statistics": ["statistics", "statistical", "a/b testing", "experimentation", "hypothesis"],
+    "mlops": ["mlops", "model deployment", "model monitoring", "feature store"],
+    "docker": ["docker", "container", "containers", "containerization"],
+    "kubernetes": ["kubernetes", "k8s", "helm"],
+    "ci/cd": ["ci/cd", "continuous integration", "continuous delivery", "continuous deployment", "jenkins", "github actions"],
+    "devops": ["devops", "sre", "on-call", "incident", "terraform", "infrastructure as code"],
+    "aws": ["aws", "amazon web services", "ec2", "s3", "lambda"],
+    "cloud": ["cloud", "gcp", "azure"],
+    "observability": ["observability", "monitoring", "logging", "tracing", "prometheus", "grafana"],
+    "javascript": ["javascript", "typescript", "node.js", "nodejs"],
+    "react": ["react", "frontend", "front-end"],
+    "java": ["java", "jvm", "spring"],
+    "testing": ["testing", "unit tests", "test automation", "tdd", "qa"],
+    "networking": ["networking", "tcp", "http", "dns", "load balancer", "load balancing"],
+    "operating systems": ["operating system", "operating systems", "linux", "unix", "kernel", "virtual memory"],
+    "algorithms": ["algorithm", "algorithms", "data structures", "dynamic programming", "graph algorithms"],
+    "security": ["security", "authentication", "authorization", "oauth", "owasp"],
+    "communication": ["communication", "stakeholders", "stakeholder", "cross-functional"],
+    "collaboration": ["collaboration", "collaborate", "teamwork"],
+    "leadership": ["leadership", "lead", "mentor", "mentoring"],
+    "ownership": ["ownership", "ownership mindset", "accountability", "prioritize", "prioritization"],
+}
+_SKILL_PATTERNS = {
+    skill: re.compile("|".join(r"(?<![a-z0-9])" + re.escape(alias) + r"(?![a-z0-9])" for alias in aliases))
+    for skill, aliases in SKILL_ALIASES.items()
+}
+
+
+def detect_skills(text):
+    """Skills mentioned in the text, ordered by first mention."""
+    lowered = text.lower()
+    found = []
+    for skill, pattern in _SKILL_PATTERNS.items():
+        match = pattern.search(lowered)
+        if match:
+            found.append((match.start(), skill))
+    return [skill for _, skill in sorted(found)]
+
+
+def _embed(text):
+    return hashing_vector(text, INDEX_FEATURES)
+
+
+class QuestionBank:
+    """Vectors live in three blocks: curated questions (embedded at startup),
+    previously generated questions (memory-mapped from disk) and questions added
+    in this process (a growable in-memory buffer)."""
+
+    def __init__(self, curated_path=CURATED_PATH, generated_path=GENERATED_PATH,
+                 vectors_path=GENERATED_VECTORS_PATH, use_mmap=USE_MMAP):
+        self._lock = threading.Lock()
+        self.generated_path = generated_path
+        self.vectors_path = vectors_path
+        self.use_mmap = use_mmap
+
+        with open(curated_path) as f:
+            self.entries = [dict(entry, source="curated") for entry in json.load(f)]
+        self._curated = np.stack([_embed(entry["question"]) for entry in self.entries])
+
+        generated, self._stored = self._load_generated()
+        self.entries.extend(generated)
+        self._added = np.zeros((16, INDEX_FEATURES), dtype=np.float32)
+        self._added_count = 0
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared by every process using these files, held while reading or appending them."""
+        os.makedirs(os.path.dirname(self.vectors_path), exist_ok=True)
+        with open(self.vectors_path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _repair_files(self):
+        """Cut generated.jsonl and generated.f32 back to the rows present in both; returns the entries.
+
+        A crash mid-append can leave a partial line, a partial vector or one file
+        a row ahead; left alone, every later append would pair questions with the
+        wrong vectors. Caller holds the file lock.
+        """
+        if not (os.path.exists(self.generated_path) and os.path.exists(self.vectors_path)):
+            for path in (self.generated_path, self.vectors_path):
+                if os.path.exists(path):
+                    os.truncate(path, 0)
+            return []
+        entries, offsets = [], [0]
+        with open(self.generated_path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    entry = None
+                if entry is None:
+                    break
+                entries.append(entry)
+                offsets.append(offsets[-1] + len(line))
+        count = min(len(entries), os.path.getsize(self.vectors_path) // ROW_BYTES)
+        if os.path.getsize(self.generated_path) != offsets[count]:
+            os.truncate(self.generated_path, offsets[count])
+        if os.path.getsize(self.vectors_path) != count * ROW_BYTES:
+            os.truncate(self.vectors_path, count * ROW_BYTES)
+        return entries[:count]
+
+    def _load_generated(self):
+        """Previously generated questions; their vectors are memory-mapped rather than re-embedded."""
+        empty = np.zeros((0, INDEX_FEATURES), dtype=np.float32)
+        if not (self.use_mmap and os.path.exists(self.generated_path) and os.path.exists(self.vectors_path)):
+            return [], empty
+        with self._file_lock():
+            generated = self._repair_files()
+        if not generated:
+            return [], empty
+        vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(generated), INDEX_FEATURES))
+        return generated, vectors
+
+    def _scores(self, query):
+        # Caller holds the lock; returns scores aligned with self.entries
+        return np.concatenate([self._curated @ query, self._stored @ query,
+                               self._added[:self._added_count] @ query])
+
+    def search(self, text, k=5, min_similarity=MIN_SIMILARITY):
+        """Top-k (score, entry) pairs by cosine similarity to the text."""
+        query = _embed(text)
+        with self._lock:
+            scores = self._scores(query)
+            entries = self.entries
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), entries[i]) for i in top if scores[i] >= min_similarity]
+
+    def add(self, question, skills):
+        """Insert a generated question unless it near-duplicates one already in the bank."""
+        vector = _embed(question)
+        with self._lock:
+            if float(np.max(self._scores(vector))) >= DUPLICATE_SIMILARITY:
+                return False
+            if self._added_count == len(self._added):
+                grown = np.zeros((len(self._added) * 2, INDEX_FEATURES), dtype=np.float32)
+                grown[:self._added_count] = self._added
+                self._added = grown
+            self._added[self._added_count] = vector
+            self._added_count += 1
+            entry = {"question": question, "skills": list(skills), "source": "generated"}
+            self.entries.append(entry)
+            if self.use_mmap:
+                # Other workers append to the same files: repair and append as one step under the file lock
+                with self._file_lock():
+                    self._repair_files()
+                    with open(self.vectors_path, "ab") as f:
+                        f.write(vector.tobytes())
+                    with open(self.generated_path, "a") as f:
+                        f.write(json.dumps(entry) + "\n")
+        return True
+
+    def with_skills(self, skills):
+        """Entries tagged with any of the skills."""
+        skills = set(skills)
+        with self._lock:
+            return [entry for entry in self.entries if skills & set(entry["skills"])]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_bank():
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            _bank = QuestionBank()
+        return _bank
+
+
+def select_questions(job_description, num_questions):
+    """Pick bank questions covering the JD's skills.
+
+    Returns (questions, gap_skills): questions ordered by the JD skill they cover,
+    and the skills the bank had nothing relevant for.
+    """
+    skills = detect_skills(job_description)
+    bank = get_bank()
+    # Rank the whole bank once; skill tags decide relevance, similarity breaks ties
+    hits = bank.search(job_description, k=len(bank), min_similarity=0.0)
+    chosen, covered = [], set()
+
+    for skill in skills:
+        if len(chosen) >= num_questions:
+            break
+        if skill in covered:
+            continue
+        for score, entry in hits:
+            if skill in entry["skills"] and entry["question"] not in chosen:
+                chosen.append(entry["question"])
+                covered.update(entry["skills"])
+                break
+    # Remaining slots only go to close matches when the JD mentions no skills we know of
+    if not skills:
+        for score, entry in hits:
+            if len(chosen) >= num_questions or score < MIN_SIMILARITY:
+                break
+            if entry["question"] not in chosen:
+                chosen.append(entry["question"])
+
+    gap_skills = [skill for skill in skills if skill not in covered]
+    return chosen, gap_skills
@@ -1,37 +1,69 @@
 # question_generator.py
-from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage
-import os
-from dotenv import load_dotenv
+import re
+import llm_client
+import question_bank
+import prompt_templates
+import fallbacks
 
-load_dotenv()
-llm = ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"), temperature=0.7)
+SPARE_QUESTIONS = 2  # extra questions requested, so dropping duplicates rarely leaves the set short
 
 
 def generate_question(mode: str, difficulty: str):
     print("mode:", mode)
     print("difficulty:", difficulty)
     prompt = f"Generate a {difficulty} level technical interview question for a {mode} role, suitable for top companies. The question should be clear, concise, and appropriate for a coding/technical interview. Aim for unique questions not commonly found with a quick search. Do not include any preamble, just the question itself."
-    response = llm.invoke([HumanMessage(content=prompt)]) # Use invoke
-    return response.content
+    try:
+        response = llm_client.invoke("generate_question", [HumanMessage(content=prompt)], coalesce=False) # Concurrent users should get different questions
+    except llm_client.LLMUnavailable as e:
+        print(f"⚠️ Serving a bank question: {e}")
+        return {"question": fallbacks.question_for(mode, difficulty), "degraded": True}
+    return {"question": response.content, "degraded": False}
+
+def _closest_bank_questions(job_description, exclude, count):
+    return [entry["question"] for _, entry in question_bank.get_bank().search(job_description, k=count + len(exclude), min_similarity=0.0)
+            if entry["question"] not in exclude][:count]
 
 def generate_jd_based_questions(job_description: str, num_questions: int = 3):
-    prompt = f"""
-    Analyze the following job description carefully.
-    Based *only* on the skills, technologies, and responsibilities mentioned in this job description, generate {num_questions} distinct interview questions.
-    The questions can be a mix of technical, behavioral (related to specific JD competencies), or scenario-based.
-    For each question, ensure it directly assesses something stated or implied in the JD.
-    Return the questions as a numbered list. Do not include any other text or preamble.
-
-    Job Description:
-    ---
-    {job_description}
-    ---
-
-    Generated Questions:
-    """
-    response = llm.invoke([HumanMessage(content=prompt)]) # Use invoke
+    # Serve what we can from the local question bank; the LLM only fills skill gaps
+    bank_questions, gap_skills = question_bank.select_questions(job_description, num_questions)
+    missing = num_questions - len(bank_questions)
+    if missing <= 0:
+        return {"questions": bank_questions, "from_bank": len(bank_questions), "generated": 0, "degraded": False}
+
+    focus = ""
+    if gap_skills:
+        focus = f"Focus on these skills from the job description: {', '.join(gap_skills)}."
+    chosen = ""
+    if bank_questions:
+        chosen = "Already chosen (don't repeat these):\n" + "\n".join(f"- {q}" for q in bank_questions)
+    messages = prompt_templates.render("generate_jd_questions", num_questions=missing + SPARE_QUESTIONS, focus=focus,
+                                       chosen=chosen, job_description=job_description)
+    try:
+        response = llm_client.invoke("generate_jd_questions", messages)
+    except llm_client.LLMUnavailable as e:
+        # Fill the gap with the closest bank questions, even if they don't cover the missing skills
+        print(f"⚠️ Serving bank questions only: {e}")
+        questions = bank_questions + _closest_bank_questions(job_description, bank_questions, missing)
+        return {"questions": questions, "from_bank": len(questions), "generated": 0, "degraded": True}
     questions = [q.strip() for q in response.content.splitlines() if q.strip() and q.strip()[0].isdigit()]
     if not questions: # Fallback if LLM doesn't number them or output is unexpected
         questions = [q.strip() for q in response.content.splitlines() if q.strip()]
-    return {"questions": questions if questions else [response.content]} # Ensure it's always a list
\ No newline at end of file
+    # Strip the list numbering so generated questions read like bank questions
+    questions = [re.sub(r"^\d+[.)]\s*", "", q) for q in questions]
+
+    # add() rejects near-duplicates of anything in the bank, including the questions
+    # chosen above and those generated earlier in this loop
+    bank = question_bank.get_bank()
+    generated = []
+    for question in questions:
+        if len(generated) == missing:
+            break
+        if question not in bank_questions and bank.add(question, question_bank.detect_skills(question) or gap_skills):
+            generated.append(question)
+
+    questions = bank_questions + generated
+    if len(generated) < missing:
+        questions += _closest_bank_questions(job_description, questions, missing - len(generated))
+    return {"questions": questions if questions else [response.content], # Ensure it's always a list
+            "from_bank": len(questions) - len(generated), "generated": len(generated), "degraded": False}
@@ -0,0 +1,184 @@
+# sandbox_exec.py
+# Runs candidate source in a child Python process without writing it to disk:
+# the source is piped to `python -` over stdin, and each job gets its own scratch
+# directory as its working directory, removed as soon as the job finishes.
+#
+# Output is read incrementally with a hard byte cap per stream, so a program
+# that prints in a loop can't grow the server's memory; stream_process yields
+# chunks as they arrive for live output.
+import os
+import sys
+import time
+import codecs
+import select
+import selectors
+import tempfile
+import subprocess
+from contextlib import contextmanager
+
+SCRATCH_PREFIX = "interview-job-"
+MAX_OUTPUT_BYTES = 64 * 1024  # per stream (stdout/stderr) for candidate programs
+HARNESS_MAX_RESULT_BYTES = 64 * 1024 * 1024  # harness result frames; candidate prints go to its stderr
+READ_CHUNK = 4096
+
+
+@contextmanager
+def job_scratch_dir():
+    """Per-job working directory, deleted on exit even if the job fails or times out."""
+    with tempfile.TemporaryDirectory(prefix=SCRATCH_PREFIX) as path:
+        yield path
+
+
+def truncation_marker(limit):
+    return f"\n... [output truncated after {limit} bytes]\n"
+
+
+def stream_process(args, input_bytes, timeout, max_bytes, kill_on_overflow=True):
+    """Run a process in a scratch dir, yielding ("stdout"|"stderr", bytes) chunks as they arrive,
+    ("truncated", stream) once a stream hits its cap, and finally ("exit", info).
+
+    max_bytes maps stream name to its cap. Past the cap a stream's output is
+    dropped; with kill_on_overflow the process is also killed (Output Limit Exceeded).
+    The process is killed if the consumer stops iterating early.
+    """
+    with job_scratch_dir() as cwd:
+        proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, cwd=cwd)
+        try:
+            yield from _pump(proc, input_bytes, timeout, max_bytes, kill_on_overflow)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            for pipe in (proc.stdin, proc.stdout, proc.stderr):
+                if pipe and not pipe.closed:
+                    pipe.close()
+
+
+def _pump(proc, input_bytes, timeout, max_bytes, kill_on_overflow):
+    deadline = time.monotonic() + timeout
+    received = {"stdout": 0, "stderr": 0}
+    timed_out = output_limit_exceeded = False
+    pending_input = memoryview(input_bytes)
+
+    with selectors.DefaultSelector() as selector:
+        if pending_input:
+            selector.register(proc.stdin, selectors.EVENT_WRITE, "stdin")
+        else:
+            proc.stdin.close()
+        selector.register(proc.stdout, selectors.EVENT_READ, "stdout")
+        selector.register(proc.stderr, selectors.EVENT_READ, "stderr")
+
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                proc.kill()
+                break
+            for key, _ in selector.select(remaining):
+                name = key.data
+                if name == "stdin":
+                    # A writable pipe accepts PIPE_BUF bytes without blocking
+                    try:
+                        written = os.write(key.fd, pending_input[:select.PIPE_BUF])
+                    except BrokenPipeError:
+                        written = len(pending_input)  # child exited without reading its input
+                    pending_input = pending_input[written:]
+                    if not pending_input:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                    continue
+
+                chunk = os.read(key.fd, READ_CHUNK)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    continue
+                limit = max_bytes[name]
+                kept = chunk[:max(0, limit - received[name])]
+                # The first discarded byte may start a chunk rather than fall inside one
+                overflowed = received[name] <= limit < received[name] + len(chunk)
+                received[name] += len(chunk)
+                if kept:
+                    yield name, kept
+                if overflowed:
+                    yield "truncated", name
+                    if kill_on_overflow:
+                        output_limit_exceeded = True
+                        proc.kill()
+
+    try:
+        returncode = proc.wait(timeout=max(0.0, deadline - time.monotonic()) + 1)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        proc.kill()
+        returncode = proc.wait()
+    yield "exit", {"returncode": returncode, "timed_out": timed_out,
+                   "output_limit_exceeded": output_limit_exceeded, "bytes": received}
+
+
+class ExecResult:
+    def __init__(self, stdout, stderr, returncode, timed_out, output_limit_exceeded, truncated):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = returncode
+        self.timed_out = timed_out
+        self.output_limit_exceeded = output_limit_exceeded
+        self.truncated = truncated  # streams that hit their byte cap
+
+
+def _collect(events, max_bytes, text):
+    chunks = {"stdout": [], "stderr": []}
+    truncated = []
+    info = {}
+    for kind, data in events:
+        if kind == "exit":
+            info = data
+        elif kind == "truncated":
+            truncated.append(data)
+        else:
+            chunks[kind].append(data)
+
+    output = {}
+    for name, parts in chunks.items():
+        value = b"".join(parts)
+        if text:
+            value = value.decode(errors="replace")
+            if name in truncated:
+                value += truncation_marker(max_bytes[name])
+        output[name] = value
+    return ExecResult(output["stdout"], output["stderr"], info["returncode"], info["timed_out"],
+                      info["output_limit_exceeded"], truncated)
+
+
+def run_source(source, timeout=10, max_bytes=MAX_OUTPUT_BYTES):
+    """Execute source as a script with bounded output capture; returns an ExecResult with text output."""
+    limits = {"stdout": max_bytes, "stderr": max_bytes}
+    events = stream_process([sys.executable, "-"], source.encode(), timeout, limits)
+    return _collect(events, limits, text=True)
+
+
+def run_harness(harness_path, payload, timeout):
+    """Run a harness script fed with a binary payload on stdin; returns an ExecResult with bytes output.
+
+    The candidate's own prints land on the harness's stderr, which is capped and
+    drained rather than killing the harness, so per-case verdicts still come back.
+    """
+    limits = {"stdout": HARNESS_MAX_RESULT_BYTES, "stderr": MAX_OUTPUT_BYTES}
+    events = stream_process([sys.executable, harness_path], payload, timeout, limits, kill_on_overflow=False)
+    return _collect(events, limits, text=False)
+
+
+def stream_source(source, timeout=10, max_bytes=MAX_OUTPUT_BYTES):
+    """Like run_source, but yields (kind, text) events while the program runs for live output."""
+    limits = {"stdout": max_bytes, "stderr": max_bytes}
+    decoders = {name: codecs.getincrementaldecoder("utf-8")(errors="replace") for name in limits}
+    for kind, data in stream_process([sys.executable, "-"], source.encode(), timeout, limits):
+        if kind in decoders:
+            text = decoders[kind].decode(data)
+            if text:
+                yield kind, text
+        elif kind == "truncated":
+            decoders[data].reset()  # drop a character cut in half at the cap
+            yield data, truncation_marker(limits[data])
+        else:
+            yield kind, data
@@ -0,0 +1,153 @@
+# sandbox_protocol.py
+# Length-prefixed binary frames used between code_evaluator and sandbox_runner.
+#
+# Frame layout: >IH header (body length, out-of-band buffer count), the pickle
+# protocol 5 body, then each out-of-band buffer as a >Q length plus raw bytes.
+# Large binary payloads (bytes, arrays) travel as out-of-band buffers instead of
+# being copied into the pickle stream.
+import io
+import pickle
+import struct
+import hashlib
+
+HEADER = struct.Struct(">IH")
+BUFFER_HEADER = struct.Struct(">Q")
+PREVIEW_CHARS = 200  # values with a longer repr are summarized in API payloads
+MAX_VALUE_BYTES = 1024 * 1024  # result values that pickle larger are sent back as a summary
+SUMMARY_KEYS = {"truncated", "type", "preview", "digest"}
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class SafeUnpickler(pickle.Unpickler):
+    """Unpickler that refuses to import any global, so frames coming back from
+    candidate code can only contain plain data (numbers, strings, containers)."""
+
+    def find_class(self, module, name):
+        raise ProtocolError(f"Refusing to unpickle {module}.{name}")
+
+
+def encode_frame(obj):
+    buffers = []
+    body = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    parts = [HEADER.pack(len(body), len(buffers)), body]
+    for buffer in buffers:
+        raw = buffer.raw()
+        parts.append(BUFFER_HEADER.pack(raw.nbytes))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+def write_frame(stream, obj):
+    stream.write(encode_frame(obj))
+    stream.flush()
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ProtocolError("Truncated frame")
+    return data
+
+
+def read_frame(stream, safe=False):
+    """Read one frame from a binary stream; returns None at a clean end of stream."""
+    header = stream.read(HEADER.size)
+    if not header:
+        return None
+    if len(header) != HEADER.size:
+        raise ProtocolError("Truncated frame header")
+    body_length, buffer_count = HEADER.unpack(header)
+    body = _read_exact(stream, body_length)
+    buffers = []
+    for _ in range(buffer_count):
+        (size,) = BUFFER_HEADER.unpack(_read_exact(stream, BUFFER_HEADER.size))
+        buffers.append(_read_exact(stream, size))
+    if safe:
+        return SafeUnpickler(io.BytesIO(body), buffers=buffers).load()
+    return pickle.loads(body, buffers=buffers)
+
+
+def read_frames(data, safe=False, partial=False):
+    """Decode every frame in a byte string.
+
+    With partial, a truncated last frame (the writer was killed mid-write) is
+    dropped instead of raising.
+    """
+    stream = io.BytesIO(data)
+    frames = []
+    while True:
+        try:
+            frame = read_frame(stream, safe=safe)
+        except ProtocolError as e:
+            if partial and "Truncated" in str(e):
+                return frames
+            raise
+        if frame is None:
+            return frames
+        frames.append(frame)
+
+
+def is_plain(value):
+    """True if the value survives a round trip through SafeUnpickler.
+
+    Self-referencing or extremely deep containers count as not plain.
+    """
+    try:
+        return _is_plain(value)
+    except RecursionError:
+        return False
+
+
+def _is_plain(value):
+    # Exact type checks: subclasses (IntEnum, namedtuple, ...) pickle by reference
+    if value is None or type(value) in (bool, int, float, str, bytes):
+        return True
+    if type(value) in (list, tuple, set, frozenset):
+        return all(_is_plain(item) for item in value)
+    if type(value) is dict:
+        return all(_is_plain(k) and _is_plain(v) for k, v in value.items())
+    return False
+
+
+def safe_repr(value):
+    """repr() that can't fail: candidate objects may define a broken __repr__ or nest too deeply."""
+    try:
+        return repr(value)
+    except Exception:
+        return f"<unrepresentable {type(value).__name__} object>"
+
+
+def digest(value):
+    return hashlib.sha256(pickle.dumps(value, protocol=5)).hexdigest()[:16]
+
+
+def is_summary(value):
+    return type(value) is dict and value.get("truncated") is True and SUMMARY_KEYS <= value.keys()
+
+
+def summarize_value(value, limit=PREVIEW_CHARS):
+    """Return the value itself if it is small, otherwise a preview plus digest."""
+    if is_summary(value):
+        return value
+    text = repr(value)
+    if len(text) <= limit:
+        return value
+    summary = {
+        "truncated": True,
+        "type": type(value).__name__,
+        "preview": text[:limit] + "...",
+        "digest": digest(value),
+    }
+    if hasattr(value, "__len__"):
+        summary["length"] = len(value)
+    return summary
+
+
+def cap_value(value, max_bytes=MAX_VALUE_BYTES):
+    """Return the (plain) value if it pickles to at most max_bytes, otherwise its summary."""
+    if len(pickle.dumps(value, protocol=5)) <= max_bytes:
+        return value
+    return summarize_value(value)
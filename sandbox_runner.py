@@ -0,0 +1,265 @@
+# sandbox_runner.py
+# Harness executed in a separate Python process by code_evaluator.run_test_cases.
+# It reads sandbox_protocol frames from stdin (the job, each distinct input once,
+# then the cases referencing inputs by digest), runs each case under a per-case
+# time limit and writes one result frame per case to stdout. When the job asks
+# for it, one case is then re-run under cProfile, tracemalloc and a SIGPROF line
+# sampler, and a compact profile frame is written.
+#
+# Arguments stored as stress_artifacts files arrive as a path reference and are
+# memory-mapped read-only, so they are shared through the page cache; each case
+# gets a fresh list built from the mapping before its timer starts.
+import os
+import dis
+import sys
+import mmap
+import time
+import types
+import signal
+import pstats
+import cProfile
+import tracemalloc
+
+from sandbox_protocol import read_frame, write_frame, is_plain, safe_repr, cap_value
+
+
+SUBMISSION_FILENAME = "<submission>"
+PROFILE_SAMPLE_INTERVAL = 0.001  # seconds of CPU time between line samples
+PROFILE_TOP_FUNCTIONS = 8
+PROFILE_TOP_LINES = 5
+PROFILE_TIME_LIMIT_FACTOR = 3  # profiling overhead: allow this multiple of the case's limit
+
+
+class TimeLimitExceeded(BaseException):
+    # Not an Exception, so candidate code with `except Exception:` can't swallow it
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise TimeLimitExceeded()
+
+
+def load_function(source, function_name):
+    """Execute the submitted source in a fresh module and return the requested function."""
+    module = types.ModuleType("user_module")
+    exec(compile(source, SUBMISSION_FILENAME, "exec"), module.__dict__)
+    return getattr(module, function_name, None)
+
+
+def run_case(user_function, case, args, repeat=1):
+    """Run a single case, returning a result dict with verdict and timing."""
+    time_limit = case.get("time_limit")
+    best = None
+    actual_output = None
+
+    for _ in range(repeat):
+        if time_limit:
+            signal.setitimer(signal.ITIMER_REAL, time_limit)
+        start = time.perf_counter()
+        try:
+            actual_output = user_function(*args)
+        except TimeLimitExceeded:
+            return {"verdict": "Time Limit Exceeded", "time": time_limit, "passed": False}
+        except Exception as e:
+            return {"verdict": "Runtime Error", "error": str(e), "passed": False}
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    result = {"actual": actual_output, "time": best}
+    if "expected" in case:
+        # The returned object's __eq__ is candidate code too: it may raise, be
+        # ambiguous (array-like) or never return
+        if time_limit:
+            signal.setitimer(signal.ITIMER_REAL, time_limit)
+        try:
+            matches = bool(actual_output == case["expected"])
+        except TimeLimitExceeded:
+            return {"verdict": "Time Limit Exceeded", "time": time_limit, "passed": False}
+        except Exception as e:
+            matches = False
+            result["error"] = f"Could not compare your output with the expected value: {str(e)}"
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        result["passed"] = matches
+        result["verdict"] = "Accepted" if matches else "Wrong Answer"
+    return result
+
+
+def _function_label(filename, lineno, name):
+    if filename == SUBMISSION_FILENAME:
+        return f"{name} (line {lineno})"
+    if filename == "~":  # built-ins, e.g. <built-in method builtins.max>
+        return name
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+def _jump_lines(source):
+    """Map (code, offset) of each jump without a line number of its own -- a loop's
+    back-edge, where signals are usually handled -- to the line it jumps to."""
+    lines = {}
+    pending = [compile(source, SUBMISSION_FILENAME, "exec")]
+    while pending:
+        code = pending.pop()
+        pending.extend(const for const in code.co_consts if isinstance(const, types.CodeType))
+        line_table = list(code.co_lines())
+        for instruction in dis.get_instructions(code):
+            if "JUMP" in instruction.opname and isinstance(instruction.argval, int):
+                target = next((lineno for start, end, lineno in line_table
+                               if start <= instruction.argval < end), None)
+                lines[(code, instruction.offset)] = target
+    return lines
+
+
+def profile_case(user_function, args, time_limit, source):
+    """Run one case under cProfile, tracemalloc and a line sampler; return a compact hot-spot report."""
+    line_samples = {}
+    # Built before profiling starts so the sampler itself only does dict lookups
+    jump_lines = _jump_lines(source)
+
+    def on_sample(signum, frame):
+        # Attribute the sample to the innermost line of the candidate's code on the stack
+        while frame is not None:
+            if frame.f_code.co_filename == SUBMISSION_FILENAME:
+                line = frame.f_lineno
+                if line is None:
+                    line = jump_lines.get((frame.f_code, frame.f_lasti))
+                if line is not None:
+                    line_samples[line] = line_samples.get(line, 0) + 1
+                return
+            frame = frame.f_back
+
+    signal.signal(signal.SIGPROF, on_sample)
+    profiler = cProfile.Profile()
+    status = "completed"
+    tracemalloc.start()
+    signal.setitimer(signal.ITIMER_PROF, PROFILE_SAMPLE_INTERVAL, PROFILE_SAMPLE_INTERVAL)
+    if time_limit:
+        signal.setitimer(signal.ITIMER_REAL, time_limit * PROFILE_TIME_LIMIT_FACTOR)
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        user_function(*args)
+    except TimeLimitExceeded:
+        status = "time_limit_exceeded"
+    except Exception as e:
+        status = f"error: {str(e)}"
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    functions = []
+    for (filename, lineno, name), (_, ncalls, tottime, cumtime, callers) in pstats.Stats(profiler).stats.items():
+        # Leave out the harness itself: the sampler, what it calls and the profiler's own disable call
+        if (filename == __file__ or name == "<method 'disable' of '_lsprof.Profiler' objects>"
+                or (callers and all(caller[0] == __file__ for caller in callers))):
+            continue
+        functions.append({"function": _function_label(filename, lineno, name), "calls": ncalls,
+                          "cumulative_time": round(cumtime, 6), "own_time": round(tottime, 6)})
+    functions.sort(key=lambda row: row["cumulative_time"], reverse=True)
+
+    source_lines = source.splitlines()
+    total_samples = sum(line_samples.values())
+    hot_lines = [{"line": lineno, "samples": count,
+                  "share": round(count / total_samples, 3),
+                  "code": source_lines[lineno - 1].strip() if 0 < lineno <= len(source_lines) else ""}
+                 for lineno, count in sorted(line_samples.items(), key=lambda item: item[1],
+                                             reverse=True)[:PROFILE_TOP_LINES]]
+
+    return {
+        "status": status,
+        "wall_time": round(elapsed, 6),
+        "peak_memory_bytes": peak_memory,
+        "top_functions": functions[:PROFILE_TOP_FUNCTIONS],
+        "hot_lines": hot_lines,
+    }
+
+
+_artifact_views = {}
+
+
+def load_artifact(ref):
+    """Read-only int64 memoryview over a memory-mapped artifact file, mapped once per process."""
+    key = (ref["path"], ref["offset"], ref["count"])
+    if key not in _artifact_views:
+        with open(ref["path"], "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _artifact_views[key] = memoryview(mapped)[ref["offset"]:ref["offset"] + ref["count"] * 8].cast("q")
+    return _artifact_views[key]
+
+
+def case_args(case, inputs):
+    """The case's arguments, with artifact references replaced by lists (built outside the timed run)."""
+    args = inputs[case["input_ref"]]
+    if case.get("artifacts"):
+        args = list(args)
+        for position, ref in case["artifacts"].items():
+            args[position] = load_artifact(ref).tolist()
+    return args
+
+
+def read_job(stream):
+    """Read the job frame, the deduplicated inputs and the cases."""
+    job, inputs, cases = None, {}, []
+    while True:
+        frame = read_frame(stream)
+        if frame is None:
+            return job, inputs, cases
+        kind, payload = frame
+        if kind == "job":
+            job = payload
+        elif kind == "input":
+            inputs[payload["digest"]] = payload["value"]
+        elif kind == "case":
+            cases.append(payload)
+
+
+def main():
+    job, inputs, cases = read_job(sys.stdin.buffer)
+    # Keep a private handle on the real stdout for result frames and point fd 1 at
+    # stderr, so anything the candidate prints can't corrupt the protocol stream
+    results_out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+    try:
+        user_function = load_function(job["source"], job["function_name"])
+    except Exception as e:
+        write_frame(results_out, ("fatal", f"Error loading your code: {str(e)}"))
+        return
+    if user_function is None:
+        write_frame(results_out, ("fatal", f"Function '{job['function_name']}' not found in your code"))
+        return
+
+    for i, case in enumerate(cases):
+        try:
+            args = case_args(case, inputs)
+        except (OSError, ValueError) as e:
+            write_frame(results_out, ("fatal", f"Could not load test data: {str(e)}"))
+            return
+        result = run_case(user_function, case, args, job.get("repeat", 1))
+        if "actual" in result:
+            # Huge outputs come back as a summary: the verdict was decided above, and
+            # the result stream stays far below the harness's output cap
+            result["actual"] = cap_value(result["actual"] if is_plain(result["actual"]) else safe_repr(result["actual"]))
+        result["index"] = i
+        write_frame(results_out, ("result", result))
+        if job.get("stop_on_failure") and not result.get("passed"):
+            break
+
+    profile_index = job.get("profile_index")
+    if profile_index is not None:
+        case = cases[profile_index]
+        report = profile_case(user_function, case_args(case, inputs), case.get("time_limit"), job["source"])
+        report["case_index"] = profile_index
+        write_frame(results_out, ("profile", report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# sql_evaluator.py
+# Evaluates SQL answers against per-question fixture databases. Each fixture is
+# built once into an in-memory SQLite database and cloned per submission with
+# the backup API, so candidates always start from a pristine copy.
+import time
+import sqlite3
+import threading
+from collections import Counter
+
+from sandbox_protocol import summarize_value
+
+STATEMENT_TIMEOUT = 2.0  # seconds per query
+# Authorizer actions a candidate's query may perform; anything else (ATTACH,
+# PRAGMA, writes, DDL, transactions) is denied before the statement runs
+ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+PROGRESS_INTERVAL = 1000  # SQLite VM instructions between deadline checks
+
+SQL_QUESTION_REGISTRY = {
+    2: {  # Highest salary per department
+        # Shown in place of the generated question, since submissions are graded against reference_query
+        "question": "Using the departments and employees tables, return each department's name and its highest "
+                    "salary as top_salary, one row per department that has employees, ordered by top_salary "
+                    "(highest first) and then by department name.",
+        "schema": """
+CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE employees (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    department_id INTEGER REFERENCES departments(id),
+    salary INTEGER NOT NULL
+);
+CREATE INDEX idx_employees_department ON employees(department_id);
+""",
+        "reference_query": """
+SELECT d.name, MAX(e.salary) AS top_salary
+FROM departments d JOIN employees e ON e.department_id = d.id
+GROUP BY d.id
+ORDER BY top_salary DESC, d.name
+""",
+        "ordered": True,  # compare row order, not just the multiset of rows
+        "cases": [
+            {"name": "Basic departments", "data": """
+INSERT INTO departments VALUES (1, 'Engineering'), (2, 'Sales'), (3, 'Support');
+INSERT INTO employees VALUES
+    (1, 'Ada', 1, 180000), (2, 'Linus', 1, 165000), (3, 'Grace', 2, 120000),
+    (4, 'Alan', 2, 95000), (5, 'Barbara', 3, 70000);
+"""},
+            {"name": "Department without employees", "data": """
+INSERT INTO departments VALUES (1, 'Engineering'), (2, 'Legal');
+INSERT INTO employees VALUES (1, 'Ada', 1, 150000), (2, 'Edsger', 1, 150000);
+"""},
+            {"name": "Ties across departments", "data": """
+INSERT INTO departments VALUES (1, 'Ops'), (2, 'Data'), (3, 'Design');
+INSERT INTO employees VALUES
+    (1, 'Ken', 1, 100000), (2, 'Dennis', 2, 100000), (3, 'Margaret', 3, 90000),
+    (4, 'John', 3, 40000);
+"""},
+        ],
+    },
+    # Add more SQL question IDs and their fixtures here
+}
+
+# (question_id, case index) -> fixture connection built once; only ever read via backup()
+_fixtures = {}
+_fixtures_lock = threading.Lock()
+# question_id -> [{"rows": [...], "time": seconds}] for the reference query
+_reference_results = {}
+
+
+class StatementTimeout(Exception):
+    pass
+
+
+def get_sql_question(question_id):
+    return SQL_QUESTION_REGISTRY.get(question_id)
+
+
+def _get_fixture(question_id, case_index):
+    key = (question_id, case_index)
+    with _fixtures_lock:
+        fixture = _fixtures.get(key)
+        if fixture is None:
+            question = SQL_QUESTION_REGISTRY[question_id]
+            fixture = sqlite3.connect(":memory:", check_same_thread=False)
+            fixture.executescript(question["schema"] + question["cases"][case_index]["data"])
+            fixture.commit()
+            _fixtures[key] = fixture
+        return fixture
+
+
+def _authorize(action, arg1, arg2, db_name, trigger):
+    return sqlite3.SQLITE_OK if action in ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def clone_fixture(question_id, case_index):
+    """Return a private in-memory copy of a fixture database that only accepts read queries.
+
+    Candidate SQL runs inside the server process, so besides query_only the
+    connection refuses ATTACH (which would create files on the server), PRAGMA
+    and every other non-read action.
+    """
+    fixture = _get_fixture(question_id, case_index)
+    conn = sqlite3.connect(":memory:")
+    with _fixtures_lock:
+        fixture.backup(conn)
+    conn.execute("PRAGMA query_only = ON")
+    conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 0)
+    conn.set_authorizer(_authorize)
+    return conn
+
+
+def run_query(conn, query, timeout=STATEMENT_TIMEOUT):
+    """Run a single statement with a deadline; returns (columns, rows, elapsed seconds)."""
+    deadline = time.perf_counter() + timeout
+    # A non-zero return from the progress handler aborts the running statement
+    conn.set_progress_handler(lambda: time.perf_counter() > deadline, PROGRESS_INTERVAL)
+    start = time.perf_counter()
+    try:
+        cursor = conn.execute(query)
+        rows = cursor.fetchall()
+    except sqlite3.OperationalError as e:
+        if time.perf_counter() > deadline:
+            raise StatementTimeout() from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+    elapsed = time.perf_counter() - start
+    columns = [column[0] for column in cursor.description or []]
+    return columns, rows, elapsed
+
+
+def query_plan(conn, query):
+    """EXPLAIN QUERY PLAN details, e.g. 'SCAN e' or 'SEARCH d USING INTEGER PRIMARY KEY'."""
+    try:
+        return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query)]
+    except sqlite3.Error:
+        return []
+
+
+def _normalize(rows):
+    # Round floats so AVG()-style answers don't fail on representation noise
+    return [tuple(round(v, 6) if isinstance(v, float) else v for v in row) for row in rows]
+
+
+def rows_match(expected, actual, ordered):
+    expected, actual = _normalize(expected), _normalize(actual)
+    if ordered:
+        return expected == actual
+    return Counter(expected) == Counter(actual)
+
+
+def get_reference_results(question_id):
+    if question_id not in _reference_results:
+        question = SQL_QUESTION_REGISTRY[question_id]
+        results = []
+        for i in range(len(question["cases"])):
+            conn = clone_fixture(question_id, i)
+            try:
+                _, rows, elapsed = run_query(conn, question["reference_query"])
+            finally:
+                conn.close()
+            results.append({"rows": rows, "time": elapsed})
+        _reference_results[question_id] = results
+    return _reference_results[question_id]
+
+
+def evaluate_sql(user_query: str, question_id: int):
+    question = get_sql_question(question_id)
+    if not question:
+        return {"success": False, "error": f"No SQL fixtures defined for question ID {question_id}"}
+    if not user_query.strip():
+        return {"success": False, "error": "Query is empty."}
+
+    try:
+        reference = get_reference_results(question_id)
+    except Exception as e:
+        return {"success": False, "error": f"Error preparing fixtures: {str(e)}"}
+
+    results = []
+    passed = 0
+    plan = []
+    total_time = reference_time = 0.0
+
+    for i, case in enumerate(question["cases"]):
+        conn = clone_fixture(question_id, i)
+        result = {"test_case": i + 1, "input": case["name"], "passed": False}
+        try:
+            if not plan:
+                plan = query_plan(conn, user_query)
+            _, rows, elapsed = run_query(conn, user_query)
+            matches = rows_match(reference[i]["rows"], rows, question.get("ordered", False))
+            result.update({
+                "passed": matches,
+                "verdict": "Accepted" if matches else "Wrong Answer",
+                "expected": summarize_value(reference[i]["rows"]),
+                "actual": summarize_value(rows),
+                "time": elapsed,
+            })
+            total_time += elapsed
+            reference_time += reference[i]["time"]
+        except StatementTimeout:
+            result.update({"verdict": "Time Limit Exceeded", "time": STATEMENT_TIMEOUT})
+        except sqlite3.Error as e:
+            result.update({"verdict": "Runtime Error", "error": str(e)})
+        finally:
+            conn.close()
+
+        if result["passed"]:
+            passed += 1
+        results.append(result)
+
+    return {
+        "success": True,
+        "passed": passed,
+        "total": len(results),
+        "results": results,
+        "performance": {
+            "query_plan": plan,
+            # Full table scans are what usually separates a slow answer from an indexed one
+            "full_scans": [step for step in plan if step.startswith("SCAN")],
+            "time_ms": total_time * 1000,
+            "reference_time_ms": reference_time * 1000,
+        },
+    }
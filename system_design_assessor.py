@@ -1,14 +1,172 @@
 # system_design_assessor.py
-from langchain_openai import ChatOpenAI
+# Assesses each rubric dimension separately, concurrently, over only the sections
+# of the response relevant to it. Per-dimension results are cached by a hash of
+# their input, so revising one section only re-assesses the dimensions that read it.
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from langchain.schema import HumanMessage
-import os
-from dotenv import load_dotenv
+import llm_client
+import fallbacks
+
+PROMPT_VERSION = 1  # bump to invalidate cached assessments when the prompt changes
+CACHE_SIZE = 512
+# Design requests assessed in parallel; each fans out one routed call per dimension,
+# so this times len(RUBRIC) must stay within model_router.MAX_CONCURRENT_REQUESTS
+CONCURRENT_ASSESSMENTS = 8
+
+# dimension -> section names it reads and keywords that make any other section relevant.
+# Keywords match whole words (plurals included); a trailing "*" matches any word starting with the stem.
+# Keep them specific: a word most sections use (e.g. "request") pulls every section into a dimension.
+RUBRIC = {
+    "scalability": {
+        "label": "Scalability",
+        "sections": ["scalability", "scaling", "architecture", "overview", "requirements"],
+        "keywords": ["scale", "scaled", "scaling", "shard*", "partition*", "replica*", "horizontal*", "vertical*", "throughput", "qps", "traffic"],
+    },
+    "database_choice": {
+        "label": "Database choice",
+        "sections": ["database", "databases", "storage", "data model", "schema"],
+        "keywords": ["database", "sql", "nosql", "postgres*", "mysql", "cassandra", "dynamodb", "mongodb", "schema", "index", "indices", "indexing", "storage"],
+    },
+    "caching": {
+        "label": "Caching",
+        "sections": ["caching", "cache"],
+        "keywords": ["cache", "cached", "caching", "redis", "memcached", "cdn", "ttl", "evict*", "invalidat*"],
+    },
+    "api_design": {
+        "label": "API design",
+        "sections": ["api", "api design", "endpoints", "interface"],
+        "keywords": ["api", "endpoint", "rest", "restful", "grpc", "graphql", "paginat*", "idempot*"],
+    },
+    "load_balancing": {
+        "label": "Load balancing",
+        "sections": ["load balancing", "load balancer", "networking", "traffic"],
+        "keywords": ["load balanc*", "round robin", "least connections", "consistent hashing", "health check", "failover", "nginx", "haproxy"],
+    },
+}
+
+
+def _keyword_pattern(keywords):
+    words = [re.escape(k[:-1]) + r"[a-z0-9]*" if k.endswith("*") else re.escape(k) + r"(?:s|es)?" for k in keywords]
+    return re.compile(r"(?<![a-z0-9])(?:" + "|".join(words) + r")(?![a-z0-9])")
+
+
+_KEYWORD_PATTERNS = {dimension: _keyword_pattern(rubric["keywords"]) for dimension, rubric in RUBRIC.items()}
+
+_executor = ThreadPoolExecutor(max_workers=len(RUBRIC) * CONCURRENT_ASSESSMENTS, thread_name_prefix="design")
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _normalize(name):
+    return re.sub(r"[^a-z0-9]+", " ", str(name).lower()).strip()
+
+
+def _section_text(value):
+    return value if isinstance(value, str) else json.dumps(value, sort_keys=True, default=str)
+
+
+def relevant_sections(dimension, user_response):
+    """The sections a dimension reads: those named for it, or mentioning its keywords."""
+    rubric = RUBRIC[dimension]
+    relevant = {}
+    for name, value in user_response.items():
+        text = _section_text(value)
+        if _normalize(name) in rubric["sections"] or _KEYWORD_PATTERNS[dimension].search(text.lower()):
+            relevant[str(name)] = text
+    return relevant
+
+
+def _cache_key(dimension, sections):
+    payload = json.dumps([PROMPT_VERSION, dimension, sorted(sections.items())])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _parse_assessment(content):
+    match = re.search(r"score\s*[:\-]\s*(\d+(?:\.\d+)?)\s*(?:/\s*10)?", content, re.IGNORECASE)
+    score = min(10.0, float(match.group(1))) if match else None
+    feedback = re.sub(r"^\s*score\s*[:\-].*$", "", content, count=1, flags=re.IGNORECASE | re.MULTILINE)
+    feedback = re.sub(r"^\s*feedback\s*:\s*", "", feedback.strip(), flags=re.IGNORECASE)
+    return score, feedback.strip()
+
+
+def assess_dimension(dimension, sections):
+    label = RUBRIC[dimension]["label"]
+    body = "\n\n".join(f"[{name}]\n{text}" for name, text in sections.items())
+    prompt = f"""You are reviewing a candidate's system design answer. Assess only its {label.lower()}.
+
+    Relevant sections of the candidate's answer:
+    {body}
+
+    Respond in exactly this format:
+    Score: <integer from 1 to 10>
+    Feedback: <two to four sentences on strengths, gaps and one concrete improvement for {label.lower()}>
+    """
+    response = llm_client.invoke("assess_design", [HumanMessage(content=prompt)])
+    score, feedback = _parse_assessment(response.content)
+    return {"score": score, "feedback": feedback}
+
+
+def _cached(key):
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+        return result
+
+
+def _store(key, result):
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
 
-load_dotenv()
-llm = ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"), temperature=0.7)
 
 def assess_design(user_response: dict):
-    prompt = f"Evaluate the following system design responses: {user_response}. \
-              Provide structured feedback on scalability, database choice, caching, API design, and load balancing."
-    response = llm([HumanMessage(content=prompt)])
-    return response.content
+    """Return a structured report with a score and feedback per rubric dimension."""
+    dimensions = {}
+    futures = {}
+    degraded = False
+
+    for dimension in RUBRIC:
+        sections = relevant_sections(dimension, user_response)
+        if not sections:
+            dimensions[dimension] = {"score": 0, "feedback": f"{RUBRIC[dimension]['label']} was not addressed.",
+                                     "sections": [], "cached": False}
+            continue
+        key = _cache_key(dimension, sections)
+        cached = _cached(key)
+        if cached is not None:
+            dimensions[dimension] = dict(cached, sections=list(sections), cached=True)
+        else:
+            futures[dimension] = (key, sections, _executor.submit(assess_dimension, dimension, sections))
+
+    for dimension, (key, sections, future) in futures.items():
+        try:
+            result = future.result()
+        except llm_client.LLMUnavailable:
+            # Template feedback for this dimension; not cached, so it's re-assessed once the LLM is back
+            rubric = RUBRIC[dimension]
+            keywords = [keyword.rstrip("*") for keyword in rubric["keywords"]]
+            dimensions[dimension] = {"score": None, "feedback": fallbacks.design_feedback(rubric["label"], keywords),
+                                     "sections": list(sections), "cached": False}
+            degraded = True
+            continue
+        except Exception as e:
+            dimensions[dimension] = {"score": None, "feedback": f"Assessment failed: {str(e)}",
+                                     "sections": list(sections), "cached": False}
+            continue
+        _store(key, result)
+        dimensions[dimension] = dict(result, sections=list(sections), cached=False)
+
+    scores = [d["score"] for d in dimensions.values() if d["score"] is not None]
+    return {
+        "dimensions": {dimension: dimensions[dimension] for dimension in RUBRIC},
+        "overall_score": round(sum(scores) / len(scores), 1) if scores else None,
+        "reassessed": list(futures),
+        "degraded": degraded,
+    }
@@ -1,25 +1,19 @@
 # text_evaluator.py
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-llm = ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"), temperature=0.7)
+import llm_client
+import prescorer
+import prompt_templates
+import fallbacks
 
 def evaluate_text_answer(answer: str, question: str):
-    prompt = f"""Evaluate the following answer to a technical interview question:
-
-    Question: "{question}"
-    Answer: "{answer}"
-
-    Provide structured feedback based on:
-    - Relevance
-    - Completeness
-    - Clarity
-    - Technical correctness
+    # Trivial answers (empty-ish, copied question, off-topic) get instant local feedback
+    prescore = prescorer.prescore(answer, question, "evaluate_text_answer")
+    if prescore["skip"]:
+        return {"feedback": prescorer.templated_feedback(prescore["reason"]), "degraded": False}
 
-    Return a paragraph of feedback, and rate the answer from 1 to 10.
-    """
-    response = llm([HumanMessage(content=prompt)])
-    return response.content
+    messages = prompt_templates.render("evaluate_text_answer", question=question, answer=answer,
+                                       signals=prescorer.describe_features(prescore["features"]))
+    try:
+        response = llm_client.invoke("evaluate_text_answer", messages)
+    except llm_client.LLMUnavailable:
+        return {"feedback": fallbacks.text_feedback(prescore["features"]), "degraded": True}
+    return {"feedback": response.content, "degraded": False}
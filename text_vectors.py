@@ -0,0 +1,52 @@
+# text_vectors.py
+# Hashing-trick bag-of-words vectors in NumPy for cheap local text similarity.
+import re
+import zlib
+import numpy as np
+
+N_FEATURES = 2 ** 14
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers him his how i if in into is it its itself just me more
+most my no nor not now of off on once only or other our out over own same she should so some
+such than that the their them then there these they this those through to too under until up
+very was we were what when where which while who whom why will with would you your yours
+""".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _bucket(token, n_features):
+    # crc32 rather than hash(): stable across processes, so stored vectors stay valid
+    return zlib.crc32(token.encode()) % n_features
+
+
+def hashing_vector(text, n_features=N_FEATURES):
+    """L2-normalized, sublinear-tf hashed term vector (float32)."""
+    vector = np.zeros(n_features, dtype=np.float32)
+    tokens = tokenize(text)
+    if not tokens:
+        return vector
+    np.add.at(vector, [_bucket(token, n_features) for token in tokens], 1.0)
+    np.log1p(vector, out=vector)
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector
+
+
+def hashing_matrix(texts, n_features=N_FEATURES):
+    matrix = np.zeros((len(texts), n_features), dtype=np.float32)
+    for i, text in enumerate(texts):
+        matrix[i] = hashing_vector(text, n_features)
+    return matrix
+
+
+def cosine(a, b):
+    """Cosine similarity of two vectors produced by hashing_vector (already normalized)."""
+    return float(np.dot(a, b))
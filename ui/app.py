@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import json
+import uuid
 
 # --- Page Configuration ---
 st.set_page_config(page_title="AI Interview Coach", layout="wide", initial_sidebar_state="expanded")
@@ -12,16 +13,21 @@ default_states = {
     "followups": [],
     "answered_followups": {},
     "current_question_id": 1, # For test case mapping in standard mode
+    "current_language": "python", # "sql" for Database & SQL questions
     "question": None,           # The current active question text
     "test_cases": None,         # Test cases for the current standard coding question
     "jd_questions_list": [],    # List of questions generated from JD
     "current_jd_question_index": -1, # Index of the current JD question (-1 if none active)
     "active_interaction_type": None, # "main_question" or "follow_up"
-    "current_follow_up_index": -1 # Index of the currently active follow-up
+    "current_follow_up_index": -1, # Index of the currently active follow-up
+    "session_id": None, # Identifies this browser session to the evaluator (failed-first ordering)
+    "batch_followups": False # Answer all follow-ups in one form, graded in a single request
 }
 for key, value in default_states.items():
     if key not in st.session_state:
         st.session_state[key] = value
+if not st.session_state.session_id:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # --- Helper Function to Reset for New Question ---
 def reset_for_new_main_question():
@@ -36,6 +42,18 @@ def reset_jd_mode_state():
     st.session_state.jd_questions_list = []
     st.session_state.current_jd_question_index = -1
 
+def format_test_value(value):
+    """Large test values come back from the API as a preview + digest summary."""
+    if isinstance(value, dict) and value.get("truncated"):
+        size = f", {value['length']} items" if "length" in value else ""
+        return f"{value['preview']} ({value['type']}{size}, sha256:{value['digest']})"
+    return value
+
+def show_degraded_notice(data):
+    """The API flags responses it served without the LLM (outage or timeout)."""
+    if data.get("degraded"):
+        st.info("The AI service is currently unavailable, so this response comes from the local question bank and feedback templates.")
+
 # --- Title ---
 st.title("🚀 AI-Powered Interview Coach")
 
@@ -70,6 +88,7 @@ with tab1:
                 question_data = data.get("question")
                 if question_data and question_data != "No question generated":
                     st.session_state.question = question_data
+                    show_degraded_notice(data)
                     st.session_state.active_interaction_type = "main_question"
                     
                     question_id_map = {
@@ -78,6 +97,7 @@ with tab1:
                         "Networking & OS": 5, "Behavioral & HR": 6, "Cloud Computing & DevOps": 7,
                     }
                     st.session_state.current_question_id = question_id_map.get(mode, 0) # Default to 0 if mode not found
+                    st.session_state.current_language = "sql" if mode == "Database & SQL Queries" else "python"
                     
                     if mode in ["Data Structures & Algorithms", "Database & SQL Queries"] and st.session_state.current_question_id != 0:
                         try:
@@ -87,6 +107,9 @@ with tab1:
                                 )
                             if test_cases_res.status_code == 200:
                                 st.session_state.test_cases = test_cases_res.json()
+                                # Submissions are graded against these tests, so show the question they belong to
+                                if st.session_state.test_cases.get("question"):
+                                    st.session_state.question = st.session_state.test_cases["question"]
                             else:
                                 st.warning(f"Could not fetch test cases (Status: {test_cases_res.status_code}). No pre-defined test cases for this one, or an error occurred.")
                         except requests.exceptions.RequestException as e_tc:
@@ -121,6 +144,7 @@ with tab2:
                 if res.status_code == 200:
                     data = res.json()
                     st.session_state.jd_questions_list = data.get("questions", [])
+                    show_degraded_notice(data)
                     if st.session_state.jd_questions_list:
                         st.session_state.current_jd_question_index = 0
                         st.session_state.question = st.session_state.jd_questions_list[0]
@@ -168,7 +192,11 @@ if st.session_state.question and st.session_state.active_interaction_type == "ma
         if st.session_state.test_cases and st.session_state.test_cases.get("status") == "success":
             test_case_data = st.session_state.test_cases
             with st.expander("View Test Cases"):
-                st.write(f"**Function Name (if applicable)**: `{test_case_data.get('function_name')}`")
+                if test_case_data.get("language") == "sql":
+                    st.write("Your query will run against fixture databases with this schema:")
+                    st.code(test_case_data.get("schema", ""), language="sql")
+                else:
+                    st.write(f"**Function Name (if applicable)**: `{test_case_data.get('function_name')}`")
                 st.write("Your code might be tested with inputs like these:")
                 for case in test_case_data.get("test_cases", []):
                     st.code(f"Test {case.get('test_number')}: Input -> {json.dumps(case.get('input'))}")
@@ -177,13 +205,26 @@ if st.session_state.question and st.session_state.active_interaction_type == "ma
 
         # Dynamic key for text area
         main_code_area_key = f"main_code_area_{hash(current_main_question)}"
-        user_code = st.text_area("Write your Python code here:", height=300, key=main_code_area_key)
+        # JD questions are always treated as Python
+        code_language = st.session_state.current_language if st.session_state.current_jd_question_index == -1 else "python"
+        code_label = "Write your SQL query here:" if code_language == "sql" else "Write your Python code here:"
+        user_code = st.text_area(code_label, height=300, key=main_code_area_key)
+
+        quick_check = st.checkbox(
+            "Quick check (previously failed tests first, stop at the first failure)",
+            key=f"main_quick_check_{hash(current_main_question)}"
+        )
+        profile_code = code_language == "python" and st.checkbox(
+            "Profile my solution on the largest test (hot spots feed into the AI feedback)",
+            key=f"main_profile_{hash(current_main_question)}"
+        )
 
         main_submit_code_key = f"main_submit_code_btn_{hash(current_main_question)}"
         if st.button("Submit Code Solution", key=main_submit_code_key):
             if user_code.strip():
                 eval_results_display = None # To store formatted eval results for memory
                 ai_feedback_text = "Could not get AI feedback." # Default
+                profile_report = None
 
                 # 1. Evaluate code with test cases (if applicable)
                 # For JD mode, question_id might be 0 or irrelevant for specific test cases.
@@ -191,7 +232,9 @@ if st.session_state.question and st.session_state.active_interaction_type == "ma
                 q_id_for_eval = st.session_state.current_question_id if st.session_state.current_jd_question_index == -1 else 0
                 
                 with st.spinner("Running your code against test cases..."):
-                    eval_payload = {"language": "python", "user_code": user_code, "question_id": q_id_for_eval}
+                    eval_payload = {"language": code_language, "user_code": user_code, "question_id": q_id_for_eval,
+                                    "session_id": st.session_state.session_id, "quick_check": quick_check,
+                                    "profile": profile_code}
                     eval_response = requests.post("http://localhost:8000/evaluate-code", json=eval_payload)
 
                 if eval_response.status_code == 200:
@@ -201,16 +244,40 @@ if st.session_state.question and st.session_state.active_interaction_type == "ma
                         passed = result.get('passed', 0)
                         total = result.get('total', 0)
                         percentage = result.get('passed_percentage', 0)
-                        st.success(f"{passed}/{total} Tests Passed ({percentage:.1f}%)")
-                        eval_results_display = f"{passed}/{total} Tests Passed ({percentage:.1f}%)"
+                        if result.get("stopped_early"):
+                            st.warning(f"Quick check stopped at the first failure: {passed}/{result.get('ran', total)} run tests passed ({total} in the full suite)")
+                            eval_results_display = f"Quick check: {passed}/{result.get('ran', total)} run tests passed, stopped at first failure"
+                        else:
+                            st.success(f"{passed}/{total} Tests Passed ({percentage:.1f}%)")
+                            eval_results_display = f"{passed}/{total} Tests Passed ({percentage:.1f}%)"
                         with st.expander("Detailed Test Results", expanded=not (passed == total and total > 0) ):
                             for test in result.get("results", []):
                                 test_icon = "✅" if test.get("passed") else "❌"
                                 color = "green" if test.get("passed") else "red"
-                                st.markdown(f"<span style='color:{color};'>{test_icon} **Test {test.get('test_case')}**: Input: `{test.get('input')}`</span>", unsafe_allow_html=True)
-                                if not test.get("passed"):
-                                    st.markdown(f"    Expected: `{test.get('expected')}`, Got: `{test.get('actual')}`")
+                                verdict = test.get("verdict") or ("Accepted" if test.get("passed") else "Failed")
+                                timing = f" ({test.get('time'):.3f}s)" if test.get("time") is not None else ""
+                                if test.get("time_limit") is not None and timing:
+                                    timing = f" ({test.get('time'):.3f}s / {test.get('time_limit'):.2f}s limit)"
+                                label = "Stress test" if test.get("stress") else f"Input: `{format_test_value(test.get('input'))}`"
+                                st.markdown(f"<span style='color:{color};'>{test_icon} **Test {test.get('test_case')}** — {verdict}{timing}: {label}</span>", unsafe_allow_html=True)
+                                if not test.get("passed") and verdict != "Time Limit Exceeded":
+                                    st.markdown(f"    Expected: `{format_test_value(test.get('expected'))}`, Got: `{format_test_value(test.get('actual'))}`")
                                     if "error" in test and test.get("error"): st.error(f"    Error: {test.get('error')}")
+                        performance = result.get("performance")
+                        if performance:
+                            with st.expander("Query Performance"):
+                                st.write(f"Your query: {performance.get('time_ms', 0):.2f} ms (reference: {performance.get('reference_time_ms', 0):.2f} ms)")
+                                st.code("\n".join(performance.get("query_plan", [])), language="text")
+                                if performance.get("full_scans"):
+                                    st.warning(f"Full table scans: {', '.join(performance['full_scans'])}")
+                        profile_report = result.get("profile")
+                        if profile_report:
+                            with st.expander("Profiling Report"):
+                                st.write(f"Test {profile_report.get('test_case')}: {profile_report.get('wall_time', 0):.3f}s under the profiler "
+                                         f"({profile_report.get('status')}), peak memory {profile_report.get('peak_memory_bytes', 0) / 1024:.1f} KB")
+                                st.table(profile_report.get("top_functions", []))
+                                for hot_line in profile_report.get("hot_lines", []):
+                                    st.markdown(f"Line {hot_line['line']} ({hot_line['share']:.0%} of samples): `{hot_line['code']}`")
                     elif "error" in result:
                         st.error(f"Code Execution Error: {result.get('error')}")
                         if "details" in result and result.get("details"): st.code(result.get("details"), language="text")
@@ -224,7 +291,8 @@ if st.session_state.question and st.session_state.active_interaction_type == "ma
 
                 # 2. Get AI feedback on the code and potential follow-ups
                 with st.spinner("Getting AI feedback on your code..."):
-                    feedback_payload = {"user_code": user_code, "question": current_main_question}
+                    feedback_payload = {"user_code": user_code, "question": current_main_question,
+                                        "profile_report": profile_report, "language": code_language}
                     ai_feedback_res = requests.post("http://localhost:8000/evaluate-code-ai", json=feedback_payload)
                 
                 if ai_feedback_res.status_code == 200:
@@ -233,6 +301,7 @@ if st.session_state.question and st.session_state.active_interaction_type == "ma
                     generated_followups = ai_data.get("follow_up_questions", [])
                     
                     st.subheader("🤖 AI Code Feedback & Improvements")
+                    show_degraded_notice(ai_data)
                     st.markdown(ai_feedback_text)
 
                     if generated_followups:
@@ -270,6 +339,7 @@ if st.session_state.question and st.session_state.active_interaction_type == "ma
                 if feedback_response.status_code == 200:
                     ai_feedback_text = feedback_response.json().get("feedback", "Could not retrieve AI feedback.")
                     st.subheader("💡 AI Feedback on Your Answer")
+                    show_degraded_notice(feedback_response.json())
                     st.markdown(ai_feedback_text)
                 else:
                     st.error(f"Failed to get text feedback: {feedback_response.status_code} - {feedback_response.text}")
@@ -298,8 +368,69 @@ if st.session_state.question and st.session_state.active_interaction_type == "ma
                 st.warning("Please write an answer before submitting.")
 
 
+# --- FOLLOW-UP MODE TOGGLE ---
+if st.session_state.active_interaction_type == "follow_up" and \
+   st.session_state.followups and \
+   0 <= st.session_state.current_follow_up_index < len(st.session_state.followups):
+    st.checkbox("Answer all follow-ups together (graded in one request)", key="batch_followups")
+
+# --- BATCHED FOLLOW-UPS: ANSWER THE REMAINING ONES IN ONE FORM ---
+if st.session_state.active_interaction_type == "follow_up" and \
+   st.session_state.batch_followups and \
+   st.session_state.followups and \
+   0 <= st.session_state.current_follow_up_index < len(st.session_state.followups):
+
+    st.markdown("---")
+    st.subheader("🤔 Follow-Up Questions")
+    first_idx = st.session_state.current_follow_up_index
+    pending_followups = list(enumerate(st.session_state.followups))[first_idx:]
+
+    with st.form(key=f"batch_followups_form_{first_idx}_{hash(st.session_state.question)}"):
+        batch_inputs = []
+        for fup_idx, fup_question in pending_followups:
+            st.markdown(f"**Follow-Up Q{fup_idx + 1} of {len(st.session_state.followups)}:** {fup_question}")
+            is_code = st.checkbox("This answer is code", key=f"batch_fup_is_code_{fup_idx}_{hash(fup_question)}")
+            reply = st.text_area("Your answer:", key=f"batch_fup_reply_{fup_idx}_{hash(fup_question)}", height=120)
+            batch_inputs.append((fup_idx, fup_question, reply, "code" if is_code else "text"))
+        batch_submitted = st.form_submit_button("Submit All Follow-Up Answers")
+
+    if batch_submitted:
+        if all(reply.strip() for _, _, reply, _ in batch_inputs):
+            # The original question's answer gives the grader context; it's the latest memory entry for it
+            original_answer = next((m["response"] for m in reversed(st.session_state.memory)
+                                    if m.get("question") == st.session_state.question), "")
+            batch_payload = {
+                "original_question": st.session_state.question,
+                "original_answer": original_answer,
+                "answers": [{"question": q, "answer": reply, "type": kind} for _, q, reply, kind in batch_inputs]
+            }
+            with st.spinner("Grading your follow-up answers..."):
+                batch_response = requests.post("http://localhost:8000/evaluate-followups", json=batch_payload)
+
+            if batch_response.status_code == 200:
+                grades = batch_response.json().get("grades", [])
+                show_degraded_notice(batch_response.json())
+                for (fup_idx, fup_question, reply, kind), grade in zip(batch_inputs, grades):
+                    score = f" (Score: {grade['score']}/10)" if grade.get("score") is not None else ""
+                    feedback_text = f"{grade.get('feedback', '')}{score}"
+                    st.session_state.answered_followups[fup_idx] = {
+                        "question": fup_question, "response": reply,
+                        "feedback": feedback_text, "type": kind
+                    }
+                    st.session_state.memory.append({
+                        "question": fup_question, "response": reply,
+                        "type": f"{kind}_followup", "feedback": feedback_text
+                    })
+                st.session_state.current_follow_up_index = len(st.session_state.followups)
+                st.rerun()
+            else:
+                st.error(f"Failed to grade follow-up answers: {batch_response.status_code} - {batch_response.text}")
+        else:
+            st.warning("Please answer every follow-up before submitting.")
+
 # --- COMMON UI FOR DISPLAYING AND HANDLING FOLLOW-UP QUESTIONS (ONE AT A TIME) ---
 if st.session_state.active_interaction_type == "follow_up" and \
+   not st.session_state.batch_followups and \
    st.session_state.followups and \
    0 <= st.session_state.current_follow_up_index < len(st.session_state.followups):
 
@@ -332,7 +463,9 @@ if st.session_state.active_interaction_type == "follow_up" and \
                     # For now, its primary role here is feedback on the follow-up's code.
                     ai_feedback_res = requests.post(
                         "http://localhost:8000/evaluate-code-ai",
-                        json={"user_code": fup_code_reply, "question": current_fup_question}
+                        json={"user_code": fup_code_reply, "question": current_fup_question,
+                              # Follow-ups on a SQL question are answered in SQL too; JD questions are Python
+                              "language": st.session_state.current_language if st.session_state.current_jd_question_index == -1 else "python"}
                     )
                 if ai_feedback_res.status_code == 200:
                     ai_data = ai_feedback_res.json()